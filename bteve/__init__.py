@@ -1,19 +1,27 @@
 __version__ = '0.1.5'
 
-import busio
-import digitalio
+import time
+
+try:
+    import busio
+    import digitalio
+except ImportError:
+    # Not CircuitPython or Blinka: EVE is unavailable, but BaseEVE still works
+    pass
 
 from .registers import *
-from .eve import BaseEVE, align4, MoviePlayer
+from .eve import BaseEVE, CoprocessorException, align4, MediaFifo, MoviePlayer
 
 def spilock(f):
-    def wrapper(*args, **kwargs):
-        spi = args[0].sp
-        while not spi.try_lock():
-            pass
-        r = f(*args, **kwargs)
-        spi.unlock()
-        return r
+    # Hold the SPI lock for the call, unless a bus() scope already holds it
+    def wrapper(self, *args, **kwargs):
+        if self._bus_depth:
+            return f(self, *args, **kwargs)
+        self._lock_bus()
+        try:
+            return f(self, *args, **kwargs)
+        finally:
+            self._unlock_bus()
     return wrapper
 
 def pin(p):
@@ -33,6 +41,19 @@ class EVE(BaseEVE):
         self.configure_spi(speed)
         self.boot()
 
+    def _lock_bus(self):
+        spi = self.sp
+        if not spi.try_lock():
+            t0 = time.monotonic()
+            while not spi.try_lock():
+                pass
+            self.lock_wait += time.monotonic() - t0
+            self.lock_contended += 1
+        self.lock_count += 1
+
+    def _unlock_bus(self):
+        self.sp.unlock()
+
     @spilock
     def configure_spi(self, speed):
         self.sp.configure(baudrate = speed, phase=0, polarity=0)
@@ -47,3 +68,13 @@ class EVE(BaseEVE):
             self.sp.readinto(r)
         self.cs.value = True
         return r
+
+    @spilock
+    def transfer_into(self, hdr, wr = None, rd = None):
+        self.cs.value = False
+        self.sp.write(hdr)
+        if wr is not None:
+            self.sp.write(wr)
+        if rd is not None:
+            self.sp.readinto(rd)
+        self.cs.value = True
@@ -0,0 +1,253 @@
+"""
+Pure-Python version of CircuitPython's ``_eve`` module.
+
+Commands are encoded straight into a preallocated bytearray with
+``struct.pack_into``, and handed to the registered ``write()`` in
+chunks of up to ``BUFSIZE`` bytes. The byte stream is identical to the
+one produced by the C module.
+"""
+
+import struct
+
+_word = struct.Struct("<I")
+_pack_word = _word.pack_into
+
+_structs = {}
+
+def _cmd_struct(fmt):
+    try:
+        return _structs[fmt]
+    except KeyError:
+        s = _structs[fmt] = struct.Struct("<I" + fmt)
+        return s
+
+def _cmd_words(num, fmt, args):
+    # Slow path matching the C module exactly: 32-bit fields are
+    # truncated, 16-bit fields are packed in pairs, low half first.
+    r = [0xffffff00 | (num & 0xff)]
+    a = iter(args)
+    i = 0
+    while i < len(fmt):
+        if fmt[i] in "Ii":
+            r.append(next(a) & 0xffffffff)
+            i += 1
+        else:
+            lo = next(a) & 0xffff
+            r.append(lo | ((next(a) << 16) & 0xffffffff))
+            i += 2
+    return r
+
+class _EVE:
+
+    BUFSIZE = 2048          # Largest chunk handed to write()
+
+    vscale = 16             # Vertex2f scale, set by VertexFormat
+
+    def register(self, o):
+        self._write = o.write
+        self._buf = bytearray(self.BUFSIZE)
+        self._mv = memoryview(self._buf)
+        self._n = 0
+
+    def flush(self):
+        """Send all pending commands to ``write()``"""
+        n = self._n
+        if n:
+            self._write(self._mv[:n])
+            self._n = 0
+
+    def cc(self, b):
+        """Append bytes to the command stream"""
+        m = len(b)
+        n = self._n
+        if n + m > self.BUFSIZE:
+            self.flush()
+            if m > self.BUFSIZE:
+                self._write(b)
+                return
+            n = 0
+        self._buf[n:n + m] = b
+        self._n = n + m
+
+    def _c4(self, v):
+        n = self._n
+        if n + 4 > self.BUFSIZE:
+            self.flush()
+            n = 0
+        _pack_word(self._buf, n, v)
+        self._n = n + 4
+
+    def cmd0(self, num):
+        self._c4(0xffffff00 | num)
+
+    def cmd(self, num, fmt, args):
+        s = _cmd_struct(fmt)
+        m = s.size
+        n = self._n
+        if n + m > self.BUFSIZE:
+            self.flush()
+            n = 0
+        try:
+            s.pack_into(self._buf, n, 0xffffff00 | num, *args)
+        except (struct.error, TypeError):
+            ww = _cmd_words(num, fmt, args)
+            m = 4 * len(ww)
+            if n + m > self.BUFSIZE:
+                self.flush()
+                n = 0
+            struct.pack_into("<%dI" % len(ww), self._buf, n, *ww)
+        self._n = n + m
+
+    # The display list instructions
+
+    def AlphaFunc(self, func, ref):
+        self._c4((9 << 24) | ((func & 7) << 8) | (ref & 255))
+
+    def Begin(self, prim):
+        self._c4((31 << 24) | (prim & 15))
+
+    def BitmapExtFormat(self, fmt):
+        self._c4((46 << 24) | (fmt & 65535))
+
+    def BitmapHandle(self, handle):
+        self._c4((5 << 24) | (handle & 31))
+
+    def BitmapLayoutH(self, linestride, height):
+        self._c4((40 << 24) | ((linestride & 3) << 2) | (height & 3))
+
+    def BitmapLayout(self, format, linestride, height):
+        self._c4((7 << 24) | ((format & 31) << 19) | ((linestride & 1023) << 9) | (height & 511))
+
+    def BitmapSizeH(self, width, height):
+        self._c4((41 << 24) | ((width & 3) << 2) | (height & 3))
+
+    def BitmapSize(self, filter, wrapx, wrapy, width, height):
+        self._c4((8 << 24) | ((filter & 1) << 20) | ((wrapx & 1) << 19) | ((wrapy & 1) << 18) | ((width & 511) << 9) | (height & 511))
+
+    def BitmapSource(self, addr):
+        self._c4((1 << 24) | (addr & 0xffffff))
+
+    def BitmapSwizzle(self, r, g, b, a):
+        self._c4((47 << 24) | ((r & 7) << 9) | ((g & 7) << 6) | ((b & 7) << 3) | (a & 7))
+
+    def BitmapTransformA(self, p, v):
+        self._c4((21 << 24) | ((p & 1) << 17) | (v & 131071))
+
+    def BitmapTransformB(self, p, v):
+        self._c4((22 << 24) | ((p & 1) << 17) | (v & 131071))
+
+    def BitmapTransformC(self, v):
+        self._c4((23 << 24) | (v & 16777215))
+
+    def BitmapTransformD(self, p, v):
+        self._c4((24 << 24) | ((p & 1) << 17) | (v & 131071))
+
+    def BitmapTransformE(self, p, v):
+        self._c4((25 << 24) | ((p & 1) << 17) | (v & 131071))
+
+    def BitmapTransformF(self, v):
+        self._c4((26 << 24) | (v & 16777215))
+
+    def BlendFunc(self, src, dst):
+        self._c4((11 << 24) | ((src & 7) << 3) | (dst & 7))
+
+    def Call(self, dest):
+        self._c4((29 << 24) | (dest & 65535))
+
+    def Cell(self, cell):
+        self._c4((6 << 24) | (cell & 127))
+
+    def ClearColorA(self, alpha):
+        self._c4((15 << 24) | (alpha & 255))
+
+    def ClearColorRGB(self, red, green, blue):
+        self._c4((2 << 24) | ((red & 255) << 16) | ((green & 255) << 8) | (blue & 255))
+
+    def Clear(self, c = 1, s = 1, t = 1):
+        self._c4((38 << 24) | ((c & 1) << 2) | ((s & 1) << 1) | (t & 1))
+
+    def ClearStencil(self, s):
+        self._c4((17 << 24) | (s & 255))
+
+    def ClearTag(self, s):
+        self._c4((18 << 24) | (s & 255))
+
+    def ColorA(self, alpha):
+        self._c4((16 << 24) | (alpha & 255))
+
+    def ColorMask(self, r, g, b, a):
+        self._c4((32 << 24) | ((r & 1) << 3) | ((g & 1) << 2) | ((b & 1) << 1) | (a & 1))
+
+    def ColorRGB(self, red, green, blue):
+        self._c4((4 << 24) | ((red & 255) << 16) | ((green & 255) << 8) | (blue & 255))
+
+    def Display(self):
+        self._c4(0)
+
+    def End(self):
+        self._c4(33 << 24)
+
+    def Jump(self, dest):
+        self._c4((30 << 24) | (dest & 65535))
+
+    def LineWidth(self, width):
+        self._c4((14 << 24) | (int(16 * width) & 4095))
+
+    def Macro(self, m):
+        self._c4((37 << 24) | (m & 1))
+
+    def Nop(self):
+        self._c4(45 << 24)
+
+    def PaletteSource(self, addr):
+        self._c4((42 << 24) | (addr & 4194303))
+
+    def PointSize(self, size):
+        self._c4((13 << 24) | (int(16 * size) & 8191))
+
+    def RestoreContext(self):
+        self._c4(35 << 24)
+
+    def Return(self):
+        self._c4(36 << 24)
+
+    def SaveContext(self):
+        self._c4(34 << 24)
+
+    def ScissorSize(self, width, height):
+        self._c4((28 << 24) | ((width & 4095) << 12) | (height & 4095))
+
+    def ScissorXY(self, x, y):
+        self._c4((27 << 24) | ((x & 2047) << 11) | (y & 2047))
+
+    def StencilFunc(self, func, ref, mask):
+        self._c4((10 << 24) | ((func & 7) << 16) | ((ref & 255) << 8) | (mask & 255))
+
+    def StencilMask(self, mask):
+        self._c4((19 << 24) | (mask & 255))
+
+    def StencilOp(self, sfail, spass):
+        self._c4((12 << 24) | ((sfail & 7) << 3) | (spass & 7))
+
+    def TagMask(self, mask):
+        self._c4((20 << 24) | (mask & 1))
+
+    def Tag(self, s):
+        self._c4((3 << 24) | (s & 255))
+
+    def VertexTranslateX(self, x):
+        self._c4((43 << 24) | (int(16 * x) & 131071))
+
+    def VertexTranslateY(self, y):
+        self._c4((44 << 24) | (int(16 * y) & 131071))
+
+    def VertexFormat(self, frac):
+        self._c4((39 << 24) | (frac & 7))
+        self.vscale = 1 << frac
+
+    def Vertex2ii(self, x, y, handle = 0, cell = 0):
+        self._c4((2 << 30) | ((x & 511) << 21) | ((y & 511) << 12) | ((handle & 31) << 7) | (cell & 127))
+
+    def Vertex2f(self, x, y):
+        s = self.vscale
+        self._c4((1 << 30) | ((int(s * x) & 32767) << 15) | (int(s * y) & 32767))
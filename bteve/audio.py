@@ -0,0 +1,204 @@
+import struct
+import time
+
+from .registers import (
+    ADPCM_SAMPLES,
+    LINEAR_SAMPLES,
+    REG_PLAYBACK_FORMAT,
+    REG_PLAYBACK_FREQ,
+    REG_PLAYBACK_LENGTH,
+    REG_PLAYBACK_LOOP,
+    REG_PLAYBACK_PLAY,
+    REG_PLAYBACK_READPTR,
+    REG_PLAYBACK_START,
+    ULAW_SAMPLES,
+)
+
+_SILENCE = {LINEAR_SAMPLES: 0x00, ULAW_SAMPLES: 0xff, ADPCM_SAMPLES: 0x00}
+
+def read_wav(f):
+    """
+    Parse a WAV header, leaving ``f`` at the start of the samples.
+    Returns ``(freq, format, length, unsigned)``.
+    """
+    (riff, _, wave) = struct.unpack("<4sI4s", f.read(12))
+    if riff != b"RIFF" or wave != b"WAVE":
+        raise ValueError("Not a WAV file")
+    fmt = None
+    while True:
+        hdr = f.read(8)
+        if len(hdr) < 8:
+            raise ValueError("WAV file has no data")
+        (id, n) = struct.unpack("<4sI", hdr)
+        if id == b"fmt ":
+            fmt = struct.unpack_from("<HHIIHH", f.read(n + (n & 1)))
+        elif id == b"data":
+            break
+        else:
+            f.seek(n + (n & 1), 1)
+    if fmt is None:
+        raise ValueError("WAV file has no fmt chunk")
+    (tag, channels, freq, _, _, bits) = fmt
+    if channels != 1 or bits != 8 or tag not in (1, 7):
+        raise ValueError("WAV must be mono 8-bit PCM or u-law")
+    if tag == 1:
+        return (freq, LINEAR_SAMPLES, n, True)
+    return (freq, ULAW_SAMPLES, n, False)
+
+class AudioStreamer:
+    """
+    Plays long sample streams through a ring buffer in RAM_G.
+
+    The EVE loops over the ring, and ``service()`` refills the part behind
+    ``REG_PLAYBACK_READPTR`` from the file. Call it at least every
+    ``interval`` seconds, for example once per frame, and playback runs
+    alongside rendering. If the player laps the refill, an underrun is
+    counted and refilling resumes just behind the read pointer.
+
+    ``stats()`` reports underruns and the SPI and host CPU cost, for
+    budgeting the bus between audio, video and graphics.
+
+    :param gd: the BaseEVE
+    :param base: start of the ring in RAM_G, a multiple of 8
+    :param size: size of the ring in bytes, a multiple of 8
+    """
+
+    CHUNK = 1024
+
+    def __init__(self, gd, base, size = 0x8000):
+        assert (base | size) & 7 == 0, "Playback ring must be 8-byte aligned"
+        self.gd = gd
+        self.base = base
+        self.size = size
+        self.buf = bytearray(min(self.CHUNK, size // 2))
+        self.mv = memoryview(self.buf)
+        self.playing = False
+        self.underruns = 0
+        self.spi_bytes = 0
+        self.cpu_time = 0.0
+        self.elapsed = 0.0
+
+    def play(self, f, freq, format = LINEAR_SAMPLES, length = None, unsigned = False):
+        """
+        Start playing samples from ``f``.
+
+        :param freq: sample rate in Hz
+        :param format: ``LINEAR_SAMPLES``, ``ULAW_SAMPLES`` or ``ADPCM_SAMPLES``
+        :param length: number of bytes to play, or None for the rest of ``f``
+        :param unsigned: convert unsigned 8-bit samples to signed
+        """
+        self.f = f
+        self.format = format
+        self.remaining = length
+        self.unsigned = unsigned
+        self.fill = _SILENCE[format]
+        self.byte_rate = freq // 2 if format == ADPCM_SAMPLES else freq
+        self.interval = self.size / 4 / self.byte_rate
+        self.written = self.consumed = 0
+        self.end = None
+        self.wp = self.rp = 0
+
+        gd = self.gd
+        self._refill(self.size - 8)
+        gd.wr32(REG_PLAYBACK_START, self.base)
+        gd.wr32(REG_PLAYBACK_LENGTH, self.size)
+        gd.wr32(REG_PLAYBACK_FREQ, freq)
+        gd.wr32(REG_PLAYBACK_FORMAT, format)
+        gd.wr32(REG_PLAYBACK_LOOP, 1)
+        gd.wr32(REG_PLAYBACK_PLAY, 1)
+        self.spi_bytes += 6 * 8
+        self.t = self.t0 = time.monotonic()
+        self.playing = True
+
+    def play_wav(self, f):
+        """ Start playing a mono 8-bit PCM or u-law WAV file """
+        (freq, format, length, unsigned) = read_wav(f)
+        self.play(f, freq, format, length, unsigned)
+
+    def stop(self):
+        """ Stop playback """
+        gd = self.gd
+        gd.wr32(REG_PLAYBACK_LENGTH, 0)
+        gd.wr32(REG_PLAYBACK_PLAY, 1)
+        self.spi_bytes += 2 * 8
+        if self.playing:
+            self.elapsed += time.monotonic() - self.t0
+        self.playing = False
+
+    def service(self):
+        """ Refill the ring. Returns the number of bytes written """
+        if not self.playing:
+            return 0
+        t0 = time.monotonic()
+        size = self.size
+        rp = self.gd.rd32(REG_PLAYBACK_READPTR) - self.base
+        self.spi_bytes += 8
+        # Laps the read pointer made since the last call cannot be seen
+        laps = int((t0 - self.t) * self.byte_rate) // size
+        self.consumed += (rp - self.rp) % size + laps * size
+        self.rp = rp
+        self.t = t0
+
+        if self.end is not None and self.consumed >= self.end:
+            self.stop()
+            self.cpu_time += time.monotonic() - t0
+            return 0
+        if self.consumed >= self.written:
+            self.underruns += 1
+            skip = -rp & 7
+            self.written = self.consumed + skip
+            self.wp = (rp + skip) % size
+        room = size - 8 - (self.written - self.consumed)
+        n = self._refill(room) if room >= len(self.buf) else 0
+        self.cpu_time += time.monotonic() - t0
+        return n
+
+    async def run_async(self):
+        """ Service the ring until playback ends """
+        import asyncio
+        while self.playing:
+            self.service()
+            await asyncio.sleep(self.interval / 2)
+
+    def _refill(self, room):
+        gd = self.gd
+        size = self.size
+        done = 0
+        while room - done >= 8:
+            k = min(len(self.buf), room - done, size - self.wp) & ~7
+            n = 0
+            if self.end is None:
+                r = k if self.remaining is None else min(k, self.remaining)
+                n = self.f.readinto(self.mv[:r]) if r else 0
+                if self.remaining is not None:
+                    self.remaining -= n
+                if self.unsigned:
+                    # 8-bit WAV samples are unsigned, the EVE's are signed.
+                    # Flipped in place: CircuitPython's bytes has no translate()
+                    buf = self.buf
+                    for i in range(n):
+                        buf[i] ^= 0x80
+                if n < k:
+                    self.end = self.written + n
+            if n < k:
+                # After the end of the file, keep the ring silent until stopped
+                self.buf[n:k] = bytes([self.fill]) * (k - n)
+            gd.write_from(self.base + self.wp, self.mv[:k])
+            self.spi_bytes += 3 + k
+            self.wp = (self.wp + k) % size
+            self.written += k
+            done += k
+        return done
+
+    def stats(self):
+        """ Underruns and bus and CPU cost of playback so far """
+        elapsed = self.elapsed
+        if self.playing:
+            elapsed += time.monotonic() - self.t0
+        return {
+            "underruns": self.underruns,
+            "spi_bytes": self.spi_bytes,
+            "spi_bytes_per_second": self.spi_bytes / elapsed if elapsed else 0.0,
+            "cpu_time": self.cpu_time,
+            "cpu_fraction": self.cpu_time / elapsed if elapsed else 0.0,
+        }
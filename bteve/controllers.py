@@ -0,0 +1,142 @@
+import time
+
+# (name, byte, mask) of each button in the 6-byte Wii Classic readout.
+# Bits are 0 when pressed.
+_BUTTONS = (
+    ("A",      5, 0x10),
+    ("B",      5, 0x40),
+    ("X",      5, 0x08),
+    ("Y",      5, 0x20),
+    ("R",      4, 0x02),
+    ("L",      4, 0x20),
+    ("ZR",     5, 0x04),
+    ("ZL",     5, 0x80),
+    ("start",  4, 0x04),
+    ("select", 4, 0x10),
+    ("home",   4, 0x08),
+    ("plus",   4, 0x04),
+    ("minus",  4, 0x10),
+)
+_DPAD = (
+    ("up",     5, 0x01),
+    ("down",   4, 0x40),
+    ("right",  4, 0x80),
+    ("left",   5, 0x02),
+)
+
+class Buttons:
+    __slots__ = tuple(n for (n, _, _) in _BUTTONS)
+
+class Dpad:
+    __slots__ = tuple(n for (n, _, _) in _DPAD)
+
+class Joysticks:
+    __slots__ = ("rx", "ry", "lx", "ly")
+
+class Triggers:
+    __slots__ = ("right", "left")
+
+_IDLE = b"\xff" * 6
+
+def _decode(o, table, bits):
+    for (n, i, m) in table:
+        setattr(o, n, bool(bits & (m << (8 * (i - 4)))))
+
+class ControllerState:
+    """
+    The state of one Wii Classic controller, decoded once per poll.
+
+    ``buttons``, ``dpad``, ``joysticks`` and ``triggers`` have the same
+    fields as ``ClassicController``'s. ``pressed`` and ``released`` are
+    like ``buttons``, and ``dpad_pressed`` and ``dpad_released`` like
+    ``dpad``, but true only on the poll where that change happened.
+    ``down`` holds the raw bits of bytes 4 and 5, 1 for pressed.
+    """
+
+    __slots__ = (
+        "connected", "down", "buttons", "dpad", "joysticks", "triggers",
+        "pressed", "released", "dpad_pressed", "dpad_released",
+    )
+
+    def __init__(self):
+        self.connected = False
+        self.buttons = Buttons()
+        self.pressed = Buttons()
+        self.released = Buttons()
+        self.dpad = Dpad()
+        self.dpad_pressed = Dpad()
+        self.dpad_released = Dpad()
+        self.joysticks = Joysticks()
+        self.triggers = Triggers()
+        self.down = 0
+        self.update(_IDLE)
+        self.connected = False
+
+    def update(self, b, o = 0):
+        """ Decode the 6-byte readout at offset ``o`` in ``b`` """
+        self.connected = (b[o] | b[o + 1] | b[o + 2] | b[o + 3] | b[o + 4] | b[o + 5]) != 0
+        if not self.connected:
+            (b, o) = (_IDLE, 0)
+        down = ~(b[o + 4] | (b[o + 5] << 8)) & 0xffff
+        was = self.down
+        self.down = down
+        _decode(self.buttons, _BUTTONS, down)
+        _decode(self.dpad, _DPAD, down)
+        _decode(self.pressed, _BUTTONS, down & ~was)
+        _decode(self.dpad_pressed, _DPAD, down & ~was)
+        _decode(self.released, _BUTTONS, was & ~down)
+        _decode(self.dpad_released, _DPAD, was & ~down)
+
+        j = self.joysticks
+        (b0, b1, b2, b3) = (b[o], b[o + 1], b[o + 2], b[o + 3])
+        j.rx = (b0 & 0xC0) >> 3 | (b1 & 0xC0) >> 5 | (b2 & 0x80) >> 7
+        j.ry = b2 & 0x1F
+        j.lx = b0 & 0x3F
+        j.ly = b1 & 0x3F
+        t = self.triggers
+        t.right = b3 & 0x1F
+        t.left = (b2 & 0x60) >> 2 | (b3 & 0xE0) >> 5
+
+class Controllers:
+    """
+    Polls the Dazzler's two controllers into reusable state objects.
+
+    ``poll()`` reads into one receive buffer and updates the two
+    ``ControllerState`` objects in place, so polling makes no garbage.
+    With ``period``, ``poll()`` only reads the hardware when that many
+    seconds have passed. ``run_async()`` polls at that rate in the
+    background, or at ``ASYNC_PERIOD`` without one.
+
+    :param gd: a GameduinoCircuitPython
+    :param period: the shortest time between reads, in seconds, or None
+    """
+
+    ASYNC_PERIOD = 1 / 60   # run_async() rate when period is None
+
+    def __init__(self, gd, period = None):
+        self.gd = gd
+        self.period = period
+        self.buf = bytearray(26)
+        self.states = (ControllerState(), ControllerState())
+        self.t = None
+        self.polls = 0
+
+    def poll(self):
+        """ Update and return the two controller states """
+        if self.period is not None:
+            t = time.monotonic()
+            if self.t is not None and t - self.t < self.period:
+                return self.states
+            self.t = t
+        self.gd.read_controllers(self.buf)
+        self.states[0].update(self.buf, 2)
+        self.states[1].update(self.buf, 14)
+        self.polls += 1
+        return self.states
+
+    async def run_async(self):
+        import asyncio
+        period = self.ASYNC_PERIOD if self.period is None else self.period
+        while True:
+            self.poll()
+            await asyncio.sleep(period)
@@ -0,0 +1,663 @@
+"""
+An in-process emulation of a BT815/BT817, for running BaseEVE without hardware.
+
+The emulator plugs in at ``transfer(wr, rd)``: it decodes the 3-byte SPI
+address header and models RAM_G, RAM_DL, RAM_CMD, the command FIFO registers,
+the media FIFO, the audio playback read pointer and the swap and
+command-empty interrupt flags. The coprocessor drains the command FIFO at a configurable
+rate in bytes per second, so the host sees realistic FIFO back-pressure.
+
+Coprocessor commands are parsed and skipped with their correct lengths.
+Memory, flash, display list and media FIFO commands take effect; widgets are
+not rendered and images and video are consumed without being decoded.
+"""
+
+import struct
+import time
+import zlib
+
+from .eve import BaseEVE
+from .registers import (
+    ADPCM_SAMPLES,
+    FIFO_MAX,
+    INT_CMDEMPTY,
+    INT_SWAP,
+    OPT_FORMAT,
+    OPT_MEDIAFIFO,
+    RAM_CMD,
+    RAM_DL,
+    RAM_G_SIZE,
+    REG_CLOCK,
+    REG_CMDB_SPACE,
+    REG_CMDB_WRITE,
+    REG_CMD_DL,
+    REG_CMD_READ,
+    REG_CMD_WRITE,
+    REG_CPURESET,
+    REG_FLASH_SIZE,
+    REG_FLASH_STATUS,
+    REG_FRAMES,
+    REG_ID,
+    REG_INT_FLAGS,
+    REG_MEDIAFIFO_BASE,
+    REG_MEDIAFIFO_READ,
+    REG_MEDIAFIFO_SIZE,
+    REG_MEDIAFIFO_WRITE,
+    REG_PLAYBACK_FORMAT,
+    REG_PLAYBACK_FREQ,
+    REG_PLAYBACK_LENGTH,
+    REG_PLAYBACK_LOOP,
+    REG_PLAYBACK_PLAY,
+    REG_PLAYBACK_READPTR,
+    REG_PLAYBACK_START,
+    REG_TOUCH_RAW_XY,
+    REG_TOUCH_RZ,
+    REG_TOUCH_SCREEN_XY,
+    REG_TOUCH_TAG_XY,
+)
+
+ROM_CHIPID = 0xc0000
+
+_IO_BASE = RAM_DL               # RAM_DL, registers, RAM_CMD and the 0x309xxx registers
+_IO_SIZE = 0xa000
+_CMD = RAM_CMD - _IO_BASE
+_DL = RAM_DL - _IO_BASE
+
+OPT_FLASH = 64
+
+_u32 = struct.Struct("<I")
+
+# Argument formats of the coprocessor commands, as sent by BaseEVE
+_FORMATS = {
+    0x00: "",               # dlstart
+    0x01: "",               # swap
+    0x02: "I",              # interrupt
+    0x09: "I",              # bgcolor
+    0x0a: "I",              # fgcolor
+    0x0b: "hhIhhI",         # gradient
+    0x0c: "hhhH",           # text
+    0x0d: "hhhhhH",         # button
+    0x0e: "hhhhhH",         # keys
+    0x0f: "hhhhHHI",        # progress
+    0x10: "hhhhHHI",        # slider
+    0x11: "hhhhHHHH",       # scrollbar
+    0x12: "hhhhHH",         # toggle
+    0x13: "hhhHHHHH",       # gauge
+    0x14: "hhhHHHHH",       # clock
+    0x15: "I",              # calibrate
+    0x16: "hhHH",           # spinner
+    0x17: "",               # stop
+    0x18: "III",            # memcrc
+    0x19: "II",             # regread
+    0x1a: "II",             # memwrite
+    0x1b: "III",            # memset
+    0x1c: "II",             # memzero
+    0x1d: "III",            # memcpy
+    0x1e: "II",             # append
+    0x1f: "I",              # snapshot
+    0x20: "iiiiiiiiiiiiI",  # touch_transform
+    0x21: "iiiiiiiiiiiiI",  # bitmap_transform
+    0x22: "I",              # inflate
+    0x23: "I",              # getptr
+    0x24: "iI",             # loadimage
+    0x25: "III",            # getprops
+    0x26: "",               # loadidentity
+    0x27: "ii",             # translate
+    0x28: "ii",             # scale
+    0x29: "i",              # rotate
+    0x2a: "",               # setmatrix
+    0x2b: "II",             # setfont
+    0x2c: "hhhhi",          # track
+    0x2d: "hhhHI",          # dial
+    0x2e: "hhhHi",          # number
+    0x2f: "",               # screensaver
+    0x30: "hhHHII",         # sketch
+    0x31: "",               # logo
+    0x32: "",               # coldstart
+    0x33: "iiiiii",         # getmatrix
+    0x34: "I",              # gradcolor
+    0x36: "I",              # setrotate
+    0x37: "IIhhhh",         # snapshot2
+    0x38: "I",              # setbase
+    0x39: "II",             # mediafifo
+    0x3a: "I",              # playvideo
+    0x3b: "III",            # setfont2
+    0x3c: "I",              # setscratch
+    0x3f: "II",             # romfont
+    0x40: "",               # videostart
+    0x41: "II",             # videoframe
+    0x42: "",               # sync
+    0x43: "IHhi",           # setbitmap
+    0x44: "",               # flasherase
+    0x45: "II",             # flashwrite
+    0x46: "III",            # flashread
+    0x47: "III",            # flashupdate
+    0x48: "",               # flashdetach
+    0x49: "",               # flashattach
+    0x4a: "I",              # flashfast
+    0x4b: "",               # flashspidesel
+    0x4c: "I",              # flashspitx
+    0x4d: "II",             # flashspirx
+    0x4e: "I",              # flashsource
+    0x50: "II",             # inflate2
+    0x51: "iiii",           # rotatearound
+    0x58: "I",              # fillwidth
+    0x59: "II",             # appendf
+    0x5a: "hhII",           # animframe
+    0x5b: "",               # nop
+    0x5f: "",               # videostartf
+    0x61: "",               # testcard
+    0x67: "I",              # calllist
+}
+_ARGS = {op: struct.Struct("<" + f) for (op, f) in _FORMATS.items()}
+
+# Commands followed by a NUL-terminated string, with the offset of their
+# options argument from the end of the fixed arguments
+_STRINGS = {0x0c: 2, 0x0d: 2, 0x0e: 2, 0x12: 4}
+
+def _format_args(s):
+    # Number of extra 32-bit arguments an OPT_FORMAT string takes
+    return s.count(b"%") - 2 * s.count(b"%%")
+
+def _jpeg_length(b):
+    if b[:2] != b"\xff\xd8":
+        raise ValueError("not a JPEG")
+    i = 2
+    while i + 2 <= len(b):
+        if b[i] != 0xff:
+            raise ValueError("bad JPEG marker")
+        m = b[i + 1]
+        if m == 0xff:
+            i += 1
+        elif m == 0xd9:
+            return i + 2
+        elif (0xd0 <= m <= 0xd7) or m == 0x01:
+            i += 2
+        elif i + 4 > len(b):
+            return None
+        else:
+            i += 2 + ((b[i + 2] << 8) | b[i + 3])
+            if m == 0xda:
+                # Entropy-coded data runs until the next real marker
+                while True:
+                    i = b.find(b"\xff", i)
+                    if i < 0 or i + 1 >= len(b):
+                        return None
+                    m = b[i + 1]
+                    if m == 0 or (0xd0 <= m <= 0xd7):
+                        i += 2
+                    else:
+                        break
+    return None
+
+def _png_length(b):
+    i = 8
+    while i + 8 <= len(b):
+        (n,) = struct.unpack(">I", b[i:i + 4])
+        end = i + 12 + n
+        if b[i + 4:i + 8] == b"IEND":
+            return end if end <= len(b) else None
+        i = end
+    return None
+
+def _image_length(b):
+    if len(b) < 8:
+        return None
+    if b[:8] == b"\x89PNG\r\n\x1a\n":
+        return _png_length(b)
+    return _jpeg_length(b)
+
+def _riff_length(b):
+    if len(b) < 8:
+        return None
+    if b[:4] != b"RIFF":
+        raise ValueError("not a RIFF file")
+    return 8 + _u32.unpack_from(b, 4)[0]
+
+class _Block:
+    """ Consumes exactly ``n`` bytes, handing them to ``fn(offset, data)`` """
+
+    def __init__(self, n, fn):
+        self.n = n
+        self.fn = fn
+        self.total = 0
+        self.done = (n == 0)
+
+    def feed(self, b):
+        b = b[:self.n - self.total]
+        self.fn(self.total, bytes(b))
+        self.total += len(b)
+        self.done = (self.total == self.n)
+        return len(b)
+
+class _Inflate:
+    """ Consumes a zlib stream, decompressing it to ``store(offset, data)`` """
+
+    def __init__(self, store):
+        self.store = store
+        self.z = zlib.decompressobj()
+        self.total = 0
+        self.size = 0
+        self.done = False
+
+    def feed(self, b):
+        z = self.z
+        out = z.decompress(bytes(b))
+        self.store(self.size, out)
+        self.size += len(out)
+        n = len(b) - len(z.unused_data)
+        self.total += n
+        self.done = z.eof
+        return n
+
+class _Stream:
+    """ Consumes a file whose length is found by ``parse(head)`` """
+
+    def __init__(self, parse):
+        self.parse = parse
+        self.head = bytearray()
+        self.length = None
+        self.total = 0
+        self.done = False
+
+    def feed(self, b):
+        if self.length is None:
+            self.head += b
+            self.length = self.parse(self.head)
+            if self.length is None:
+                self.total += len(b)
+                return len(b)
+            self.head = None
+        n = min(len(b), self.length - self.total)
+        self.total += n
+        self.done = (self.total == self.length)
+        return n
+
+class Emulator:
+    """
+    An emulated BT815/BT817 device.
+
+    :param rate: coprocessor throughput in bytes per second, or None for instant
+    :param frame_rate: display refresh rate, for ``REG_FRAMES``
+    :param chip: 0x815 or 0x817
+    :param flash_size: size of the attached flash in bytes
+    :param clock: time source, in seconds
+    """
+
+    def __init__(self, rate = None, frame_rate = 60, chip = 0x815, flash_size = 0x800000, clock = time.monotonic):
+        self.rate = rate
+        self.frame_rate = frame_rate
+        self.chip = chip
+        self.flash_size = flash_size
+        self.clock = clock
+
+        self.ram = bytearray(RAM_G_SIZE)
+        self.io = bytearray(_IO_SIZE)
+        self.flash = None
+
+        self.transfers = 0
+        self.bytes_written = 0
+        self.bytes_read = 0
+        self.fifo_bytes = 0
+        self.space_polls = 0
+        self.stalls = 0
+        self.swaps = 0
+        self.faults = 0
+
+        self.reset()
+
+    def reset(self):
+        """ Power-on state: registers cleared, coprocessor idle """
+        self.io[:] = bytes(_IO_SIZE)
+        self.t0 = self.t_last = self.clock()
+        self.budget = 0.0
+        self.rp = self.wp = 0
+        self.dl = 0
+        self.sink = None
+        self.fault = False
+        self.progress = True
+        self.ptr = 0
+        self.playing = None
+        self.int_flags = 0
+        for (a, v) in (
+            (REG_ID, 0),
+            (REG_TOUCH_RAW_XY, 0xffffffff),
+            (REG_TOUCH_RZ, 32767),
+            (REG_TOUCH_SCREEN_XY, 0x80008000),
+            (REG_TOUCH_TAG_XY, 0x80008000),
+            (REG_FLASH_SIZE, self.flash_size >> 20),
+            (REG_FLASH_STATUS, 2)):
+            self._reg(a, v)
+
+    def _reg(self, a, v):
+        _u32.pack_into(self.io, a - _IO_BASE, v & 0xffffffff)
+
+    def _get(self, a):
+        return _u32.unpack_from(self.io, a - _IO_BASE)[0]
+
+    def _flash(self):
+        if self.flash is None:
+            self.flash = bytearray(b"\xff") * self.flash_size
+        return self.flash
+
+    # ------- SPI -------
+
+    def transfer(self, wr, rd = 0):
+        self.transfers += 1
+        self.bytes_written += len(wr)
+        self.bytes_read += rd
+        self.drain()
+        a = (wr[0] << 16) | (wr[1] << 8) | wr[2]
+        if rd:
+            a &= 0x3fffff
+            if a <= REG_CMDB_SPACE < a + rd:
+                self.space_polls += 1
+                if not self.progress and self.rp != self.wp:
+                    self.stalls += 1
+                self.progress = False
+            # The dummy byte may have been sent as part of the header
+            d = max(0, 4 - len(wr))
+            r = bytearray(rd)
+            r[d:] = self.load(a, rd - d)
+            return r
+        if a & 0x800000:
+            self.store(a & 0x3fffff, wr[3:])
+        elif len(wr) == 3:
+            self.host_cmd(wr[0])
+        return None
+
+    def host_cmd(self, c):
+        if c in (0x00, 0x68):       # ACTIVE, RST_PULSE
+            self.reset()
+            self._reg(REG_ID, 0x7c)
+            # The boot ROM leaves the chip ID in RAM_G
+            _u32.pack_into(self.ram, ROM_CHIPID, 0x10008 | (self.chip & 0xff) << 8)
+
+    # ------- Memory map -------
+
+    def load(self, a, n):
+        """ Read ``n`` bytes at address ``a`` """
+        if a + n <= RAM_G_SIZE:
+            return self.ram[a:a + n]
+        if _IO_BASE <= a and a + n <= _IO_BASE + _IO_SIZE:
+            self.sync()
+            o = a - _IO_BASE
+            r = self.io[o:o + n]
+            if a <= REG_INT_FLAGS < a + n:
+                self.int_flags = 0      # cleared by reading
+            return r
+        return bytes(n)
+
+    def store(self, a, data):
+        """ Write ``data`` at address ``a`` """
+        n = len(data)
+        if a == REG_CMDB_WRITE:
+            self.push(data)
+        elif a + n <= RAM_G_SIZE:
+            self.ram[a:a + n] = data
+        elif _IO_BASE <= a and a + n <= _IO_BASE + _IO_SIZE:
+            o = a - _IO_BASE
+            self.io[o:o + n] = data
+            if a <= REG_CMD_WRITE < a + n:
+                self.wp = self._get(REG_CMD_WRITE) & 0xfff
+            if a <= REG_CMD_READ < a + n:
+                self.rp = self._get(REG_CMD_READ) & 0xfff
+            if a <= REG_PLAYBACK_PLAY < a + n and (self._get(REG_PLAYBACK_PLAY) & 1):
+                self.playing = self.clock()
+            if a <= REG_CPURESET < a + n and (self._get(REG_CPURESET) & 1):
+                self.fault = False
+                self.sink = None
+                self.rp = self.wp = self.dl = 0
+
+    def sync(self):
+        """ Update the registers that the device maintains """
+        t = self.clock() - self.t0
+        self._reg(REG_CMD_READ, 0xfff if self.fault else self.rp)
+        self._reg(REG_CMD_WRITE, self.wp)
+        self._reg(REG_CMDB_SPACE, self.space())
+        self._reg(REG_CMD_DL, self.dl)
+        self._reg(REG_FRAMES, int(t * self.frame_rate))
+        self._reg(REG_CLOCK, int(t * 72000000))
+        self._playback()
+        if self.rp == self.wp and not self.fault:
+            self.int_flags |= INT_CMDEMPTY
+        self._reg(REG_INT_FLAGS, self.int_flags)
+
+    def _playback(self):
+        if self.playing is None:
+            return
+        length = self._get(REG_PLAYBACK_LENGTH)
+        n = (self.clock() - self.playing) * self._get(REG_PLAYBACK_FREQ)
+        if self._get(REG_PLAYBACK_FORMAT) == ADPCM_SAMPLES:
+            n /= 2
+        n = int(n)
+        if length and self._get(REG_PLAYBACK_LOOP):
+            n %= length
+        elif n >= length:
+            self.playing = None
+            n = length
+            self._reg(REG_PLAYBACK_PLAY, 0)
+        self._reg(REG_PLAYBACK_READPTR, self._get(REG_PLAYBACK_START) + n)
+
+    def space(self):
+        if self.fault:
+            return 0xfff
+        return FIFO_MAX - ((self.wp - self.rp) & 0xfff)
+
+    def push(self, data):
+        """ Append ``data`` to the command FIFO """
+        n = len(data)
+        assert n <= self.space(), "Command FIFO overflow"
+        o = self.wp
+        k = min(n, 4096 - o)
+        self.io[_CMD + o:_CMD + o + k] = data[:k]
+        self.io[_CMD:_CMD + n - k] = data[k:]
+        self.wp = (o + n) & 0xfff
+        self.fifo_bytes += n
+
+    # ------- Coprocessor -------
+
+    def _fifo(self, o, n):
+        o &= 0xfff
+        if o + n <= 4096:
+            return self.io[_CMD + o:_CMD + o + n]
+        return self.io[_CMD + o:_CMD + 4096] + self.io[_CMD:_CMD + o + n - 4096]
+
+    def _result(self, start, i, v):
+        self._reg(RAM_CMD + ((start + 4 * i) & 0xfff), v)
+
+    def drain(self):
+        """ Run the coprocessor for the time since the last call """
+        now = self.clock()
+        if self.rate is None:
+            budget = float("inf")
+        else:
+            budget = self.budget + (now - self.t_last) * self.rate
+        self.t_last = now
+        starved = True
+        while not self.fault:
+            avail = (self.wp - self.rp) & 0xfff
+            if self.sink is not None:
+                n = self._feed(avail, budget)
+                if n is None:
+                    break
+                budget -= n
+                continue
+            if avail < 4:
+                break
+            start = self.rp
+            (w, ) = _u32.unpack(self._fifo(start, 4))
+            if (w >> 8) != 0xffffff:
+                n = 4
+                if budget < n:
+                    starved = False
+                    break
+                self._display_list(w)
+            else:
+                n = self._command_length(w & 0xff, start, avail)
+                if n is None or n > avail:
+                    break
+                if budget < n:
+                    starved = False
+                    break
+                self._execute(w & 0xff, start, n)
+            self.rp = (self.rp + n) & 0xfff
+            budget -= n
+            self.progress = True
+        # An idle coprocessor does not bank time for later
+        self.budget = 0.0 if starved else budget
+
+    def _feed(self, avail, budget):
+        (sink, media) = self.sink
+        if sink.done:
+            if media:
+                self.sink = None
+                return 0
+            pad = -sink.total & 3
+            if avail < pad:
+                return None
+            self.rp = (self.rp + pad) & 0xfff
+            self.sink = None
+            return pad
+        if media:
+            base = self._get(REG_MEDIAFIFO_BASE)
+            size = self._get(REG_MEDIAFIFO_SIZE)
+            rd = self._get(REG_MEDIAFIFO_READ)
+            avail = (self._get(REG_MEDIAFIFO_WRITE) - rd) % size if size else 0
+            k = int(min(avail, budget, size - rd))
+            if k == 0:
+                return None
+            n = self._sink_feed(sink, memoryview(self.ram)[base + rd:base + rd + k])
+            self._reg(REG_MEDIAFIFO_READ, (rd + n) % size)
+        else:
+            k = int(min(avail, budget, 4096 - self.rp)) & ~3
+            if k == 0:
+                return None
+            n = self._sink_feed(sink, memoryview(self.io)[_CMD + self.rp:_CMD + self.rp + k])
+            self.rp = (self.rp + n) & 0xfff
+        self.progress = True
+        return n
+
+    def _sink_feed(self, sink, b):
+        try:
+            return sink.feed(b)
+        except (ValueError, zlib.error):
+            self._fault()
+            return 0
+
+    def _display_list(self, w):
+        if self.dl >= 8192:
+            self._fault()
+            return
+        _u32.pack_into(self.io, _DL + self.dl, w)
+        self.dl += 4
+
+    def _fault(self):
+        self.fault = True
+        self.faults += 1
+
+    def _command_length(self, op, start, avail):
+        s = _ARGS.get(op)
+        if s is None:
+            self._fault()
+            return None
+        n = 4 + s.size
+        if op in _STRINGS:
+            if avail < n:
+                return None
+            b = self._fifo(start + n, avail - n)
+            z = b.find(b"\x00")
+            if z < 0:
+                return None
+            (options, ) = struct.unpack("<H", self._fifo(start + n - _STRINGS[op], 2))
+            n += (z + 4) & ~3
+            if options & OPT_FORMAT:
+                n += 4 * _format_args(b[:z])
+        return n
+
+    def _execute(self, op, start, n):
+        s = _ARGS[op]
+        args = s.unpack(self._fifo(start + 4, s.size))
+        if op == 0x00:                          # dlstart
+            self.dl = 0
+        elif op == 0x01:                        # swap
+            self.swaps += 1
+            self.int_flags |= INT_SWAP
+        elif op == 0x15:                        # calibrate
+            self._result(start, 1, 1)
+        elif op == 0x18:                        # memcrc
+            (ptr, num, _) = args
+            self._result(start, 3, zlib.crc32(self.load(ptr, num)))
+        elif op == 0x19:                        # regread
+            self._result(start, 2, _u32.unpack(self.load(args[0], 4))[0])
+        elif op == 0x1a:                        # memwrite
+            (ptr, num) = args
+            self.sink = (_Block(num, lambda o, b: self.store(ptr + o, b)), False)
+        elif op == 0x1b:                        # memset
+            (ptr, value, num) = args
+            self.store(ptr, bytes([value & 0xff]) * num)
+        elif op == 0x1c:                        # memzero
+            (ptr, num) = args
+            self.store(ptr, bytes(num))
+        elif op == 0x1d:                        # memcpy
+            (dst, src, num) = args
+            self.store(dst, bytes(self.load(src, num)))
+        elif op == 0x1e:                        # append
+            (ptr, num) = args
+            b = self.load(ptr, num)
+            for i in range(0, num & ~3, 4):
+                self._display_list(_u32.unpack_from(b, i)[0])
+        elif op == 0x22:                        # inflate
+            self._inflate(args[0], False)
+        elif op == 0x23:                        # getptr
+            self._result(start, 1, self.ptr)
+        elif op == 0x24:                        # loadimage
+            self.ptr = args[0]
+            self.sink = (_Stream(_image_length), bool(args[1] & OPT_MEDIAFIFO))
+        elif op == 0x25:                        # getprops
+            self._result(start, 1, self.ptr)
+        elif op == 0x39:                        # mediafifo
+            (ptr, size) = args
+            for (a, v) in ((REG_MEDIAFIFO_BASE, ptr), (REG_MEDIAFIFO_SIZE, size),
+                           (REG_MEDIAFIFO_READ, 0), (REG_MEDIAFIFO_WRITE, 0)):
+                self._reg(a, v)
+        elif op == 0x3a:                        # playvideo
+            self.sink = (_Stream(_riff_length), bool(args[0] & OPT_MEDIAFIFO))
+        elif op == 0x44:                        # flasherase
+            self._flash()[:] = b"\xff" * self.flash_size
+        elif op == 0x45:                        # flashwrite
+            (ptr, num) = args
+            def fw(o, b):
+                self._flash()[ptr + o:ptr + o + len(b)] = b
+            self.sink = (_Block(num, fw), False)
+        elif op == 0x46:                        # flashread
+            (dest, src, num) = args
+            self.store(dest, bytes(self._flash()[src:src + num]))
+        elif op == 0x47:                        # flashupdate
+            (dest, src, num) = args
+            self._flash()[dest:dest + num] = self.load(src, num)
+        elif op == 0x4a:                        # flashfast
+            self._reg(REG_FLASH_STATUS, 3)
+            self._result(start, 1, 0)
+        elif op == 0x4c:                        # flashspitx
+            self.sink = (_Block(args[0], lambda o, b: None), False)
+        elif op == 0x50:                        # inflate2
+            (ptr, options) = args
+            if not (options & OPT_FLASH):
+                self._inflate(ptr, bool(options & OPT_MEDIAFIFO))
+
+    def _inflate(self, ptr, media):
+        def st(o, b):
+            self.store(ptr + o, b)
+            self.ptr = ptr + o + len(b)
+        self.ptr = ptr
+        self.sink = (_Inflate(st), media)
+
+class EmulatedEVE(BaseEVE):
+    """ A BaseEVE driving an in-process Emulator, for running without hardware """
+
+    def __init__(self, **kwargs):
+        self.device = Emulator(**kwargs)
+
+    def transfer(self, wr, rd = 0):
+        return self.device.transfer(wr, rd)
@@ -2,14 +2,22 @@ import time
 import struct
 import array
 import sys
-from collections import namedtuple
+import binascii
+from collections import namedtuple, OrderedDict
 
 from .registers import (
     FIFO_MAX,
+    OPT_FULLSCREEN,
+    OPT_MEDIAFIFO,
+    OPT_NOTEAR,
+    RAM_CMD,
     REG_CMDB_SPACE,
     REG_CMDB_WRITE,
+    REG_CMD_DL,
+    REG_CMD_READ,
     REG_CSPREAD,
     REG_DITHER,
+    REG_FRAMES,
     REG_FREQUENCY,
     REG_GPIOX,
     REG_GPIOX_DIR,
@@ -19,10 +27,14 @@ from .registers import (
     REG_HSYNC0,
     REG_HSYNC1,
     REG_ID,
+    REG_MEDIAFIFO_READ,
+    REG_MEDIAFIFO_WRITE,
     REG_PCLK,
     REG_PCLK_FREQ,
     REG_PCLK_POL,
     REG_SWIZZLE,
+    REG_TOUCH_RAW_XY,
+    REG_TRACKER,
     REG_VCYCLE,
     REG_VOFFSET,
     REG_VSIZE,
@@ -35,6 +47,19 @@ if sys.implementation.name == 'circuitpython':
 else:
     from ._eve import _EVE
 
+class CoprocessorException(Exception):
+    pass
+
+def _mmap(f):
+    # On CPython, map the whole file to send it without copying
+    if sys.implementation.name == 'circuitpython':
+        return None
+    try:
+        import mmap
+        return mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+    except (AttributeError, ImportError, OSError, ValueError):
+        return None
+
 _B0 = b'\x00'
 def align4(s):
     """
@@ -43,6 +68,19 @@ def align4(s):
     """
     return s + _B0 * (-len(s) & 3)
 
+def _encode(aa):
+    # aa is (string, format args...). A toggle's string is a pair of labels
+    s = aa[0]
+    if type(s) == tuple:
+        s = s[0].encode() + b'\xff' + s[1].encode()
+    elif type(s) == str:
+        s = bytes(s, "utf-8")
+    s = align4(s + _B0)
+    if len(aa) > 1:
+        # XXX MicroPython is currently lacking array.array.tobytes()
+        s += bytes(array.array("i", aa[1:]))
+    return s
+
 def f16(v):
     return int(round(65536 * v))
 
@@ -50,6 +88,97 @@ def furmans(deg):
     """ Given an angle in degrees, return it in Furmans """
     return 0xffff & f16(deg / 360.0)
 
+def _command(num, fmt, xf = None):
+    # A cmd_ method for one _COMMANDS entry
+    if not fmt:
+        def f(self):
+            self.cmd0(num)
+    elif xf is None:
+        def f(self, *args):
+            self.cmd(num, fmt, args)
+    else:
+        def f(self, *args):
+            self.cmd(num, fmt, xf(args))
+    return f
+
+# The plain coprocessor commands: name, then opcode, argument format and
+# an optional transform of the argument tuple. BaseEVE builds each
+# method when it is first used, so unused ones take no memory.
+_COMMANDS = {
+    "cmd_append":           (0x1e, "II"),
+    "cmd_bgcolor":          (0x09, "I"),
+    "cmd_bitmap_transform": (0x21, "iiiiiiiiiiiiI"),
+    "cmd_touch_transform":  (0x20, "iiiiiiiiiiiiI"),
+    "cmd_calibrate":        (0x15, "I"),
+    "cmd_clock":            (0x14, "hhhHHHHH"),
+    "cmd_coldstart":        (0x32, ""),
+    "cmd_dlstart":          (0x00, ""),
+    "cmd_fgcolor":          (0x0a, "I"),
+    "cmd_gauge":            (0x13, "hhhHHHHH"),
+    "cmd_getmatrix":        (0x33, "iiiiii"),
+    "cmd_getprops":         (0x25, "III"),
+    "cmd_getptr":           (0x23, "I"),
+    "cmd_gradcolor":        (0x34, "I"),
+    "cmd_gradient":         (0x0b, "hhIhhI"),
+    "cmd_inflate":          (0x22, "I"),
+    "cmd_interrupt":        (0x02, "I"),
+    "cmd_loadidentity":     (0x26, ""),
+    "cmd_loadimage":        (0x24, "iI"),
+    "cmd_logo":             (0x31, ""),
+    "cmd_memcpy":           (0x1d, "III"),
+    "cmd_memcrc":           (0x18, "III"),
+    "cmd_memset":           (0x1b, "III"),
+    "cmd_memwrite":         (0x1a, "II"),
+    "cmd_memzero":          (0x1c, "II"),
+    "cmd_number":           (0x2e, "hhhHi"),
+    "cmd_progress":         (0x0f, "hhhhHHI"),
+    "cmd_regread":          (0x19, "II"),
+    "cmd_screensaver":      (0x2f, ""),
+    "cmd_scrollbar":        (0x11, "hhhhHHHH"),
+    "cmd_setfont":          (0x2b, "II"),
+    "cmd_setmatrix":        (0x2a, ""),
+    "cmd_sketch":           (0x30, "hhHHII"),
+    "cmd_slider":           (0x10, "hhhhHHI"),
+    "cmd_snapshot2":        (0x37, "IIhhhh"),
+    "cmd_snapshot":         (0x1f, "I"),
+    "cmd_spinner":          (0x16, "hhHH"),
+    "cmd_stop":             (0x17, ""),
+    "cmd_swap":             (0x01, ""),
+    "cmd_track":            (0x2c, "hhhhi"),
+
+    # 810
+    "cmd_mediafifo":        (0x39, "II"),
+    "cmd_sync":             (0x42, ""),
+    "cmd_setrotate":        (0x36, "I"),
+    "cmd_setbitmap":        (0x43, "IHhi"),
+    "cmd_setfont2":         (0x3b, "III"),
+    "cmd_videoframe":       (0x41, "II"),
+    "cmd_videostart":       (0x40, ""),
+    "cmd_videostartf":      (0x5f, ""),
+    "cmd_playvideo":        (0x3a, "I"),
+    "cmd_setscratch":       (0x3c, "I"),
+
+    # 815
+    "cmd_setbase":          (0x38, "I"),
+    "cmd_flasherase":       (0x44, ""),
+    "cmd_flashupdate":      (0x47, "III"),
+    "cmd_flashread":        (0x46, "III"),
+    "cmd_flashdetach":      (0x48, ""),
+    "cmd_flashattach":      (0x49, ""),
+    "cmd_flashfast":        (0x4a, "I", lambda a: (0xdeadbeef, )),
+    "cmd_flashspidesel":    (0x4b, ""),
+    "cmd_flashsource":      (0x4e, "I"),
+    "cmd_inflate2":         (0x50, "II"),
+    "cmd_fillwidth":        (0x58, "I"),
+    "cmd_appendf":          (0x59, "II"),
+    "cmd_animframe":        (0x5a, "hhII"),
+    "cmd_nop":              (0x5b, ""),
+
+    # 817
+    "cmd_calllist":         (0x67, "I"),
+    "cmd_testcard":         (0x61, ""),
+}
+
 # Order matches the register layout, so can fill with a single block read
 _Touch = namedtuple(
     "TouchInputs",
@@ -84,8 +213,69 @@ _Inputs = namedtuple(
     "state",
     ))
 
+def _bgra_to_rgb(rgb, bgra):
+    rgb[0::3] = bgra[2::4]
+    rgb[1::3] = bgra[1::4]
+    rgb[2::3] = bgra[0::4]
+
+class _BusScope:
+    # The context manager returned by BaseEVE.bus()
+    def __init__(self, gd):
+        self.gd = gd
+
+    def __enter__(self):
+        gd = self.gd
+        if gd._bus_depth == 0:
+            gd._lock_bus()
+        gd._bus_depth += 1
+        return gd
+
+    def __exit__(self, *exc):
+        gd = self.gd
+        gd._bus_depth -= 1
+        if gd._bus_depth == 0:
+            gd._unlock_bus()
+
 class BaseEVE(_EVE):
 
+    streaming = True        # write() sends partial buffers as FIFO space frees up
+    WRITE_MIN = 512         # smallest partial write when streaming
+    POLL_MIN = 0.0001       # shortest sleep between REG_CMDB_SPACE polls
+    POLL_MAX = 0.002        # longest sleep between REG_CMDB_SPACE polls
+
+    stall_time = 0.0        # seconds spent waiting for FIFO space
+    stall_polls = 0         # REG_CMDB_SPACE polls that found too little space
+
+    lock_count = 0          # times the bus lock was taken
+    lock_contended = 0      # times it was busy and had to be waited for
+    lock_wait = 0.0         # seconds spent waiting for it
+
+    # ------- Bus locking -------
+
+    _bus_depth = 0
+    _bus_scope = None
+
+    def bus(self):
+        """
+        A transaction scope: ``with gd.bus():`` takes the bus lock once
+        for all the transfers inside it, instead of once per transfer.
+        Scopes nest. Chip select still frames each transfer, as the EVE
+        protocol requires.
+
+        Other devices on the bus, such as an SD card, cannot be used
+        inside the scope, so keep file access outside it.
+        """
+        if self._bus_scope is None:
+            self._bus_scope = _BusScope(self)
+        return self._bus_scope
+
+    def _lock_bus(self):
+        # Transports on a shared bus override these two
+        pass
+
+    def _unlock_bus(self):
+        pass
+
     # ------- Low-level operations  -------
 
     def boot(self):
@@ -116,17 +306,82 @@ class BaseEVE(_EVE):
     def _addr(self, a):
         return struct.pack(">I", a)[1:]
 
+    def transfer_into(self, hdr, wr = None, rd = None):
+        # Under one chip select: send hdr, then send wr or read into rd.
+        # Transports override this to avoid the copies made here.
+        if rd is None:
+            self.transfer(bytes(hdr) + wr)
+        else:
+            rd[:] = self.transfer(hdr, len(rd))
+
+    def _scratch(self):
+        # Per-instance buffers, so that steady-state reads and writes
+        # do not allocate
+        self._rhdr = bytearray(4)   # address and dummy byte
+        self._whdr = bytearray(3)
+        self._b4 = bytearray(4)
+
+    _rhdr = _whdr = _b4 = None
+
+    max_transfer = None     # most bytes the transport moves under one chip select
+
+    def readinto(self, a, buf):
+        """ Read ``len(buf)`` bytes from address ``a`` into ``buf`` """
+        m = self.max_transfer
+        if m is not None and len(buf) > m - 4:
+            self._split(a, buf, m - 4, self.readinto)
+            return
+        h = self._rhdr
+        if h is None:
+            self._scratch()
+            h = self._rhdr
+        h[0] = (a >> 16) & 0x3f
+        h[1] = (a >> 8) & 0xff
+        h[2] = a & 0xff
+        self.transfer_into(h, None, buf)
+
+    def write_from(self, a, buf):
+        """ Write the contents of ``buf`` to address ``a`` """
+        m = self.max_transfer
+        if m is not None and len(buf) > m - 3:
+            self._split(a, buf, m - 3, self.write_from)
+            return
+        h = self._whdr
+        if h is None:
+            self._scratch()
+            h = self._whdr
+        h[0] = 0x80 | ((a >> 16) & 0x3f)
+        h[1] = (a >> 8) & 0xff
+        h[2] = a & 0xff
+        self.transfer_into(h, buf, None)
+
+    def _split(self, a, buf, m, op):
+        # Transfer buf in word-aligned pieces of at most m bytes. The
+        # command FIFO is one address; memory pieces follow on.
+        step = m & ~3
+        mv = memoryview(buf)
+        for i in range(0, len(buf), step):
+            op(a if a == REG_CMDB_WRITE else a + i, mv[i:i + step])
+
     def rd(self, a, n):
-        return self.transfer(self._addr(a), 1 + n)[1:]
+        r = bytearray(n)
+        self.readinto(a, r)
+        return r
 
     def wr(self, a, v):
-        self.transfer(self._addr(0x800000 | a) + v)
+        self.write_from(a, v)
 
     def rd32(self, a):
-        return struct.unpack("<I", self.rd(a, 4))[0]
+        if self._b4 is None:
+            self._scratch()
+        self.readinto(a, self._b4)
+        return int.from_bytes(self._b4, "little")
 
     def wr32(self, a, v):
-        self.wr(a, struct.pack("I", v))
+        if self._b4 is None:
+            self._scratch()
+        struct.pack_into("<I", self._b4, 0, v)
+        self.write_from(a, self._b4)
 
     def getspace(self):
         self.space = self.rd32(REG_CMDB_SPACE)
@@ -134,184 +389,195 @@ class BaseEVE(_EVE):
             raise CoprocessorException
 
     def reserve(self, n):
+        if self.space < n:
+            self.wait_space(n)
+
+    def wait_space(self, n):
+        # Poll until there are n bytes free in the command FIFO.
+        # Polls back off while the coprocessor makes no progress, and are
+        # paced by its measured drain rate when it does.
+        t0 = time.monotonic()
+        s0 = self.space
+        delay = 0
+        self.getspace()
         while self.space < n:
+            delay = self._poll_delay(n, t0, s0, delay)
+            time.sleep(delay)
             self.getspace()
+        self.stall_time += time.monotonic() - t0
+
+    def _poll_delay(self, n, t0, s0, delay):
+        self.stall_polls += 1
+        t = time.monotonic() - t0
+        if self.space > s0 and t > 0:
+            delay = 0.5 * (n - self.space) * t / (self.space - s0)
+        else:
+            delay = 2 * delay
+        return min(self.POLL_MAX, max(self.POLL_MIN, delay))
 
     def is_finished(self):
         self.getspace()
         return self.space == FIFO_MAX
-            
-    def write(self, ss):
-        self.reserve(len(ss))
-        self.wr(REG_CMDB_WRITE, ss)
-        self.space -= len(ss)
-        return
 
-
-        # Write ss to the command FIFO
-        for i in range(0, len(ss), 64):
-            s = ss[i:i + 64]
-            self.reserve(len(s))
-            self.wr(REG_CMDB_WRITE, s)
-            self.space -= len(s)
+    def write(self, ss):
+        f = self._fn
+        if f is not None:
+            # Hold the frame back until swap() has compared it
+            n = len(ss)
+            if f + n <= self.FRAME_MAX:
+                self._fbuf[f:f + n] = ss
+                self._fn = f + n
+                return
+            self._write_fifo(self._take_frame())
+        self._write_fifo(ss)
+
+    def _write_fifo(self, ss):
+        # Write ss to the command FIFO. In streaming mode, write as much as
+        # currently fits instead of waiting for room for all of it.
+        n = len(ss)
+        if n <= self.space or not self.streaming:
+            self.reserve(n)
+            self.wr(REG_CMDB_WRITE, ss)
+            self.space -= n
+            return
+        mv = memoryview(ss)
+        i = 0
+        while i < n:
+            self.reserve(min(n - i, self.WRITE_MIN))
+            k = min(n - i, self.space & ~3)
+            self.wr(REG_CMDB_WRITE, mv[i:i + k])
+            self.space -= k
+            i += k
+
+    def push(self):
+        # Send all pending commands, including a held-back frame, without
+        # waiting for the coprocessor to run them
+        self.flush()
+        if self._fn:
+            self._write_fifo(self._take_frame())
 
     def finish(self):
-        self.flush()
+        self.push()
         self.reserve(FIFO_MAX)
 
     def is_idle(self):
         self.getspace()
         return self.space == FIFO_MAX
 
+    # ------- asyncio versions, which yield instead of spinning -------
 
-    # ------- Writing to the command FIFO -------
+    FLUSH_MAX = getattr(_EVE, "BUFSIZE", 512)   # most bytes one flush() sends
 
-    def cstring(self, s):
-        if type(s) == str:
-            s = bytes(s, "utf-8")
-        self.cc(align4(s + _B0))
+    async def reserve_async(self, n):
+        if self.space < n:
+            import asyncio
+            t0 = time.monotonic()
+            s0 = self.space
+            delay = 0
+            self.getspace()
+            while self.space < n:
+                delay = self._poll_delay(n, t0, s0, delay)
+                await asyncio.sleep(delay)
+                self.getspace()
+            self.stall_time += time.monotonic() - t0
+
+    async def write_async(self, ss):
+        f = self._fn
+        n = len(ss)
+        if f is not None:
+            if f + n <= self.FRAME_MAX:
+                self.write(ss)
+                return
+            await self.write_async(self._take_frame())
+        mv = memoryview(ss)
+        i = 0
+        while i < n:
+            await self.reserve_async(min(n - i, self.WRITE_MIN))
+            k = min(n - i, self.space & ~3)
+            self.wr(REG_CMDB_WRITE, mv[i:i + k])
+            self.space -= k
+            i += k
+
+    async def flush_async(self):
+        # With FLUSH_MAX bytes free, flush() cannot block
+        await self.reserve_async(self.FLUSH_MAX)
+        self.flush()
 
-    def fstring(self, aa):
-        self.cstring(aa[0])
-        # XXX MicroPython is currently lacking array.array.tobytes()
-        self.cc(bytes(array.array("i", aa[1:])))
+    async def push_async(self):
+        await self.flush_async()
+        if self._fn:
+            await self.write_async(self._take_frame())
 
-    def cmd_append(self, *args):
-        self.cmd(0x1e, "II", args)
+    async def finish_async(self):
+        await self.push_async()
+        await self.reserve_async(FIFO_MAX)
 
-    def cmd_bgcolor(self, *args):
-        self.cmd(0x09, "I", args)
+    async def swap_async(self):
+        import asyncio
+        await self.reserve_async(self.FLUSH_MAX + 8)
+        held = self._end_frame()
+        if held is not None:
+            await self.write_async(held)
+        while self._frame_pending():
+            await asyncio.sleep(self.POLL_MAX)
+        self._start_frame()
 
-    def cmd_bitmap_transform(self, *args):
-        self.cmd(0x21, "iiiiiiiiiiiiI", args)
 
-    def cmd_touch_transform(self, *args):
-        self.cmd(0x20, "iiiiiiiiiiiiI", args)
+    # ------- Writing to the command FIFO -------
+
+    def cstring(self, s):
+        self.cc(self._encoded((s, )))
+
+    def fstring(self, aa):
+        self.cc(self._encoded(aa))
+
+    TEXT_CACHE = 2048       # bytes of encoded strings kept by _encoded()
+    text_hits = text_misses = 0
+    _text_cache = None
+    _text_bytes = 0
+
+    def _encoded(self, aa):
+        # The padded wire encoding of a string and its format arguments,
+        # from a least-recently-used cache
+        c = self._text_cache
+        if c is None:
+            c = self._text_cache = OrderedDict()
+        try:
+            b = c.pop(aa, None)
+        except TypeError:           # unhashable, e.g. a bytearray
+            return _encode(aa)
+        if b is not None:
+            self.text_hits += 1
+            c[aa] = b
+            return b
+        self.text_misses += 1
+        b = _encode(aa)
+        if len(b) <= self.TEXT_CACHE:
+            self._text_bytes += len(b)
+            while self._text_bytes > self.TEXT_CACHE:
+                self._text_bytes -= len(c.pop(next(iter(c))))
+            c[aa] = b
+        return b
+
+    def __getattr__(self, name):
+        # Only reached for attributes not found normally. A cmd_ method
+        # in _COMMANDS is built on first use and stored on the class.
+        try:
+            f = _command(*_COMMANDS[name])
+        except KeyError:
+            raise AttributeError(name) from None
+        setattr(BaseEVE, name, f)
+        return getattr(self, name)
+
+    # The commands that send strings or data after their arguments
 
     def cmd_button(self, *args):
         self.cmd(0x0d, "hhhhhH", args[:6])
         self.fstring(args[6:])
 
-    def cmd_calibrate(self, *args):
-        self.cmd(0x15, "I", args)
-
-    def cmd_clock(self, *args):
-        self.cmd(0x14, "hhhHHHHH", args)
-
-    def cmd_coldstart(self):
-        self.cmd0(0x32)
-
-    def cmd_dial(self, x, y, r, options, val):
-        self.cmd(0x2d, "hhhHI", (x, y, r, options, furmans(val)))
-
-    def cmd_dlstart(self):
-        self.cmd0(0x00)
-
-    def cmd_fgcolor(self, *args):
-        self.cmd(0x0a, "I", args)
-
-    def cmd_gauge(self, *args):
-        self.cmd(0x13, "hhhHHHHH", args)
-
-    def cmd_getmatrix(self, *args):
-        self.cmd(0x33, "iiiiii", args)
-
-    def cmd_getprops(self, *args):
-        self.cmd(0x25, "III", args)
-
-    def cmd_getptr(self, *args):
-        self.cmd(0x23, "I", args)
-
-    def cmd_gradcolor(self, *args):
-        self.cmd(0x34, "I", args)
-
-    def cmd_gradient(self, *args):
-        self.cmd(0x0b, "hhIhhI", args)
-
-    def cmd_inflate(self, *args):
-        self.cmd(0x22, "I", args)
-
-    def cmd_interrupt(self, *args):
-        self.cmd(0x02, "I", args)
-
     def cmd_keys(self, *args):
         self.cmd(0x0e, "hhhhhH", args[:6])
-        self.cstring(args[6])
-
-    def cmd_loadidentity(self):
-        self.cmd0(0x26)
-
-    def cmd_loadimage(self, *args):
-        self.cmd(0x24, "iI", args)
-
-    def cmd_logo(self):
-        self.cmd0(0x31)
-
-    def cmd_memcpy(self, *args):
-        self.cmd(0x1d, "III", args)
-
-    def cmd_memcrc(self, *args):
-        self.cmd(0x18, "III", args)
-
-    def cmd_memset(self, *args):
-        self.cmd(0x1b, "III", args)
-
-    def cmd_memwrite(self, *args):
-        self.cmd(0x1a, "II", args)
-
-    def cmd_regwrite(self, ptr, val):
-        self.cmd(0x1a, "III", (ptr, 4, val))
-
-    def cmd_memzero(self, *args):
-        self.cmd(0x1c, "II", args)
-
-    def cmd_number(self, *args):
-        self.cmd(0x2e, "hhhHi", args)
-
-    def cmd_progress(self, *args):
-        self.cmd(0x0f, "hhhhHHI", args)
-
-    def cmd_regread(self, *args):
-        self.cmd(0x19, "II", args)
-
-    def cmd_rotate(self, a):
-        self.cmd(0x29, "i", (furmans(a), ))
-
-    def cmd_scale(self, sx, sy):
-        self.cmd(0x28, "ii", (f16(sx), f16(sy)))
-
-    def cmd_screensaver(self):
-        self.cmd0(0x2f)
-
-    def cmd_scrollbar(self, *args):
-        self.cmd(0x11, "hhhhHHHH", args)
-
-    def cmd_setfont(self, *args):
-        self.cmd(0x2b, "II", args)
-
-    def cmd_setmatrix(self):
-        self.cmd0(0x2a)
-
-    def cmd_sketch(self, *args):
-        self.cmd(0x30, "hhHHII", args)
-
-    def cmd_slider(self, *args):
-        self.cmd(0x10, "hhhhHHI", args)
-
-    def cmd_snapshot2(self, *args):
-        self.cmd(0x37, "IIhhhh", args)
-
-    def cmd_snapshot(self, *args):
-        self.cmd(0x1f, "I", args)
-
-    def cmd_spinner(self, *args):
-        self.cmd(0x16, "hhHH", args)
-
-    def cmd_stop(self):
-        self.cmd0(0x17)
-
-    def cmd_swap(self):
-        self.cmd0(0x01)
+        self.fstring(args[6:7])
 
     def cmd_text(self, *args):
         self.cmd(0x0c, "hhhH", args[0:4])
@@ -319,128 +585,43 @@ class BaseEVE(_EVE):
 
     def cmd_toggle(self, *args):
         self.cmd(0x12, "hhhhHH", args[0:6])
-        label = (args[6].encode() + b'\xff' + args[7].encode())
-        self.fstring((label,) + args[8:])
-
-    def cmd_touch_transform(self, *args):
-        self.cmd(0x20, "iiiiiiiiiiiiI", args)
-
-    def cmd_track(self, *args):
-        self.cmd(0x2c, "hhhhi", args)
-
-    def cmd_translate(self, tx, ty):
-        self.cmd(0x27, "ii", (f16(tx), f16(ty)))
-
-    #
-    # The new 810 commands
-    #
+        self.fstring(((args[6], args[7]), ) + args[8:])
 
     def cmd_romfont(self, *args):
         self.SaveContext()
         self.cmd(0x3f, "II", args)
         self.RestoreContext()
 
-    def cmd_mediafifo(self, *args):
-        self.cmd(0x39, "II", args)
-
-    def cmd_sync(self):
-        self.cmd0(0x42)
-
-    def cmd_setrotate(self, *args):
-        self.cmd(0x36, "I", args)
-
-    def cmd_setbitmap(self, *args):
-        self.cmd(0x43, "IHhi", args)
-
-    def cmd_setfont2(self, *args):
-        self.cmd(0x3b, "III", args)
-
-    def cmd_videoframe(self, *args):
-        self.cmd(0x41, "II", args)
-
-    def cmd_videostart(self):
-        self.cmd(0x40, "", ())
-
-    def cmd_videostartf(self):
-        self.cmd(0x5f, "", ())
-
-    # def cmd_snapshot2(self, 
-
-    def cmd_playvideo(self, *args):
-        self.cmd(0x3a, "I", args)
-
-    def cmd_setscratch(self, *args):
-        self.cmd(0x3c, "I", args)
-
-    #
-    # 815 commands
-    #
-
-    def cmd_setbase(self, *args):
-        self.cmd(0x38, "I", args)
-
-    def cmd_rotatearound(self, x, y, a, s = 1):
-        self.cmd(0x51, "iiii", (x, y, furmans(a), f16(s)))
-
-    def cmd_flasherase(self):
-        self.cmd0(0x44)
-
     def cmd_flashwrite(self, a, b):
         self.cmd(0x45, "II", (a, len(b)))
         self.cc(b)
 
-    def cmd_flashupdate(self, *args):
-        self.cmd(0x47, "III", args)
-
-    def cmd_flashread(self, *args):
-        self.cmd(0x46, "III", args)
-
-    def cmd_flashdetach(self):
-        self.cmd0(0x48)
-
-    def cmd_flashattach(self):
-        self.cmd0(0x49)
-
-    def cmd_flashfast(self):
-        self.cmd(0x4a, "I", (0xdeadbeef,))
-
-    def cmd_flashspidesel(self):
-        self.cmd0(0x4b)
-
     def cmd_flashspitx(self, b):
         self.cmd(0x4c, "I", (len(b),))
         self.cc(align4(b))
 
-    def cmd_flashspirx(self, ptr, num):
-        self.cmd(0x4d, "II", (ptr, num))
-
-    def cmd_flashsource(self, *args):
-        self.cmd(0x4e, "I", args)
+    # The commands with named parameters
 
-    def cmd_inflate2(self, *args):
-        self.cmd(0x50, "II", args)
-
-    def cmd_fillwidth(self, *args):
-        self.cmd(0x58, "I", args)
+    def cmd_dial(self, x, y, r, options, val):
+        self.cmd(0x2d, "hhhHI", (x, y, r, options, furmans(val)))
 
-    def cmd_appendf(self, *args):
-        self.cmd(0x59, "II", args)
+    def cmd_regwrite(self, ptr, val):
+        self.cmd(0x1a, "III", (ptr, 4, val))
 
-    def cmd_animframe(self, *args):
-        self.cmd(0x5a, "hhII", args)
+    def cmd_rotate(self, a):
+        self.cmd(0x29, "i", (furmans(a), ))
 
-    def cmd_nop(self):
-        self.cmd0(0x5b)
+    def cmd_scale(self, sx, sy):
+        self.cmd(0x28, "ii", (f16(sx), f16(sy)))
 
-    #
-    # 817 commands
-    #
+    def cmd_translate(self, tx, ty):
+        self.cmd(0x27, "ii", (f16(tx), f16(ty)))
 
-    def cmd_calllist(self, *args):
-        self.cmd(0x67, "I", args)
+    def cmd_rotatearound(self, x, y, a, s = 1):
+        self.cmd(0x51, "iiii", (x, y, furmans(a), f16(s)))
 
-    def cmd_testcard(self, *args):
-        self.cmd0(0x61)
+    def cmd_flashspirx(self, ptr, num):
+        self.cmd(0x4d, "II", (ptr, num))
 
     # Some higher-level functions
 
@@ -461,21 +642,208 @@ class BaseEVE(_EVE):
         self.inputs = _Inputs(t, r, s)
         return self.inputs
 
+    def result(self, n=1):
+        # Return the result field of the preceding command
+        self.finish()
+        wp = self.rd32(REG_CMD_READ)
+        return self.rd32(RAM_CMD + (4095 & (wp - 4 * n)))
+
+    vscale = 16             # Vertex2f scale, tracked here since the C _eve keeps its own
+
+    def VertexFormat(self, frac):
+        self.vscale = 1 << frac
+        super().VertexFormat(frac)
+
+    def vertices(self, xy, colors = None, sizes = None):
+        """
+        Send many vertices in one write. ``xy`` holds interleaved x, y
+        coordinates: an ``array``, a list, or on CPython a NumPy array.
+        They are scaled by the current ``VertexFormat``, and the EVE applies
+        ``VertexTranslateX/Y`` as usual.
+
+        :param colors: 0xRRGGBB for each vertex, sent as ``ColorRGB`` before it
+        :param sizes: point size in pixels for each vertex, sent as ``PointSize``
+        """
+        if hasattr(xy, "dtype"):
+            return self._vertices_np(xy, colors, sizes)
+        s = self.vscale
+        n = len(xy) // 2
+        words = self._vertex_words(n * (1 + (colors is not None) + (sizes is not None)))
+        if colors is None and sizes is None:
+            for i in range(n):
+                words[i] = 0x40000000 | ((int(s * xy[2 * i]) & 32767) << 15) | (int(s * xy[2 * i + 1]) & 32767)
+            self.cc(self._vmv[:self._vunit * n])
+            return
+        j = 0
+        for i in range(n):
+            if colors is not None:
+                words[j] = 0x04000000 | (colors[i] & 0xffffff)
+                j += 1
+            if sizes is not None:
+                words[j] = 0x0d000000 | (int(16 * sizes[i]) & 8191)
+                j += 1
+            words[j] = 0x40000000 | ((int(s * xy[2 * i]) & 32767) << 15) | (int(s * xy[2 * i + 1]) & 32767)
+            j += 1
+        self.cc(self._vmv[:self._vunit * j])
+
+    _vbuf = _vmv = None
+    _vunit = 4
+
+    def _vertex_words(self, n):
+        # A reusable array of display list words. _vmv views it as bytes
+        # where memoryview can cast; elsewhere it is indexed by word
+        if self._vbuf is None or len(self._vbuf) < n:
+            self._vbuf = array.array("I", bytes(4 * n))
+            mv = memoryview(self._vbuf)
+            if hasattr(mv, "cast"):
+                self._vmv = mv.cast("B")
+            else:
+                self._vmv = mv
+                self._vunit = 1
+        return self._vbuf
+
+    def _vertices_np(self, xy, colors, sizes):
+        import numpy as np
+        p = (np.asarray(xy).reshape(-1, 2) * self.vscale).astype(np.int64) & 32767
+        words = [0x40000000 | (p[:, 0] << 15) | p[:, 1]]
+        if sizes is not None:
+            words.insert(0, 0x0d000000 | ((np.asarray(sizes) * 16).astype(np.int64) & 8191))
+        if colors is not None:
+            words.insert(0, 0x04000000 | (np.asarray(colors).astype(np.int64) & 0xffffff))
+        self.cc(np.stack(words, axis = 1).astype("<u4").tobytes())
+
     def swap(self):
+        held = self._end_frame()
+        if held is not None:
+            self._write_fifo(held)
+        while self._frame_pending():
+            time.sleep(self.POLL_MAX)
+        self._start_frame()
+
+    frame_skip = False      # swap() drops frames identical to the one before
+    FRAME_MAX = 8192        # largest frame held back for comparison
+    frames_skipped = 0
+
+    _fbuf = _fmv = _fn = _frame_crc = _skip_frame = None
+
+    dl_warn = None          # swap() checks dl_used against this many bytes
+    dl_probe = None         # RAM_G word swap() copies REG_CMD_DL into, or None
+    dl_used = 0
+    dl_warnings = 0
+    _dl_armed = False
+
+    def check_dl(self):
+        """
+        Wait for the coprocessor, then read how much of RAM_DL the frame
+        has used so far into ``dl_used``, calling ``dl_warning()`` if it is
+        over ``dl_warn``.
+
+        ``swap()`` does not wait. When ``dl_probe`` is set, it queues a
+        ``cmd_memcpy`` of ``REG_CMD_DL`` to ``dl_probe`` in each frame and
+        checks the copy at a later swap, so the figure arrives at least
+        one frame late.
+        """
+        self.finish()
+        self._dl_check(self.rd32(REG_CMD_DL))
+
+    def _dl_check(self, n):
+        self.dl_used = n
+        if self.dl_warn is not None and n >= self.dl_warn:
+            self.dl_warnings += 1
+            self.dl_warning(n)
+
+    def dl_warning(self, n):
+        # Override to react, for example by flattening layers with FlatLayer
+        pass
+
+    def _dl_sample(self, p):
+        # Take the copy queued by an earlier frame, then queue this frame's.
+        # The word is zeroed once read, so a copy the coprocessor has not
+        # made yet reads as 0 and is skipped, rather than as stale data.
+        if self._dl_armed:
+            n = self.rd32(p)
+            if n:
+                self.wr32(p, 0)
+                self._dl_check(n)
+        else:
+            self.wr32(p, 0)
+            self._dl_armed = True
+        self.cmd_memcpy(p, REG_CMD_DL, 4)
+
+    def _end_frame(self):
+        # Finish the frame. Returns the held-back frame if it must be sent.
+        if self.dl_probe is not None:
+            self._dl_sample(self.dl_probe)
         self.Display()
         self.cmd_swap()
         self.flush()
+        n = self._fn
+        if n is None:
+            self._frame_crc = None
+            return None
+        crc = binascii.crc32(self._fmv[:n])
+        if crc == self._frame_crc:
+            # Same as the frame on screen: send nothing, but keep pace
+            # with the display
+            self.frames_skipped += 1
+            self._skip_frame = self.rd32(REG_FRAMES)
+            return None
+        self._frame_crc = crc
+        return self._fmv[:n]
+
+    def _frame_pending(self):
+        # After a skipped frame, True until the display shows the next one
+        f = self._skip_frame
+        if f is None or self.rd32(REG_FRAMES) != f:
+            self._skip_frame = None
+            return False
+        return True
+
+    def _start_frame(self):
+        if self.frame_skip:
+            if self._fbuf is None:
+                self._fbuf = bytearray(self.FRAME_MAX)
+                self._fmv = memoryview(self._fbuf)
+            self._fn = 0
+        else:
+            self._fn = None
         self.cmd_dlstart()
         self.cmd_loadidentity()
 
+    def _take_frame(self):
+        # Stop holding back this frame, returning what was held so far
+        n = self._fn
+        self._fn = None
+        self._frame_crc = None
+        return self._fmv[:n]
+
     def calibrate(self):
         self.Clear()
         self.cmd_text(self.w // 2, self.h // 2, 29, 0x0600, "Tap the dot")
         self.cmd_calibrate(0)
         self.cmd_dlstart()
 
-    def screenshot(self, dest):
-        import time
+    def screenshot(self, dest, ptr = None, size = None):
+        """
+        Capture the screen, calling ``dest`` with each scanline as RGB bytes.
+
+        With ``ptr`` and ``size``, the screen is instead rendered into a
+        RAM_G area by ``cmd_snapshot2``, in as few horizontal bands as fit,
+        and each band is read back in one transfer. This is much faster,
+        but overwrites that area.
+        """
+        self._screenshot(lambda rgb: dest(bytes(rgb)), ptr, size)
+
+    def _screenshot(self, dest, ptr = None, size = None):
+        # As screenshot(), but dest gets the same reused buffer for every
+        # line, so must consume it before returning
+        rgb = bytearray(3 * self.w)
+        if ptr is None:
+            self._screenshot_lines(dest, rgb)
+        else:
+            self._screenshot_bands(dest, rgb, ptr, size)
+
+    def _screenshot_lines(self, dest, rgb):
         REG_SCREENSHOT_EN    = 0x302010 # Set to enable screenshot mode
         REG_SCREENSHOT_Y     = 0x302014 # Y line register
         REG_SCREENSHOT_START = 0x302018 # Screenshot start trigger
@@ -490,38 +858,139 @@ class BaseEVE(_EVE):
         time.sleep(0.001)
         self.wr32(REG_SCREENSHOT_EN, 1)
         self.wr32(0x0030201c, 32)
-        
+
+        bgra = bytearray(4 * self.w)
+        busy = bytearray(8)
+        idle = bytes(8)
         for ly in range(self.h):
-            print(ly, "/", self.h)
-            self.wr32(REG_SCREENSHOT_Y, ly)
-            self.wr32(REG_SCREENSHOT_START, 1)
-            time.sleep(.002)
-            # while (self.raw_read(REG_SCREENSHOT_BUSY) | self.raw_read(REG_SCREENSHOT_BUSY + 4)): pass
-            while self.rd(REG_SCREENSHOT_BUSY, 8) != bytes(8):
-                pass
-            self.wr32(REG_SCREENSHOT_READ, 1)
-            bgra = self.rd(RAM_SCREENSHOT, 4 * self.w)
-            (b,g,r,a) = [bgra[i::4] for i in range(4)]
-            line = bytes(sum(zip(r,g,b), ()))
-            dest(line)
-            self.wr32(REG_SCREENSHOT_READ, 0)
+            with self.bus():
+                self.wr32(REG_SCREENSHOT_Y, ly)
+                self.wr32(REG_SCREENSHOT_START, 1)
+                self.readinto(REG_SCREENSHOT_BUSY, busy)
+                while busy != idle:
+                    self.readinto(REG_SCREENSHOT_BUSY, busy)
+                self.wr32(REG_SCREENSHOT_READ, 1)
+                self.readinto(RAM_SCREENSHOT, bgra)
+                self.wr32(REG_SCREENSHOT_READ, 0)
+            _bgra_to_rgb(rgb, bgra)
+            dest(rgb)
         self.wr32(REG_SCREENSHOT_EN, 0)
         self.wr32(REG_PCLK, pclk)
 
-    def screenshot_im(self):
-        self.ssbytes = b""
+    def _screenshot_bands(self, dest, rgb, ptr, size):
+        ARGB8 = 0x20                    # cmd_snapshot2 format
+        (w, h) = (self.w, self.h)
+        stride = 4 * w
+        rows = min(h, size // stride)
+        assert rows, "Snapshot area too small for one line"
+        bgra = bytearray(stride * rows)
+        mv = memoryview(bgra)
+        for y in range(0, h, rows):
+            n = min(rows, h - y)
+            self.cmd_snapshot2(ARGB8, ptr, 0, y, w, n)
+            self.finish()
+            self.readinto(ptr, mv[:stride * n])
+            for i in range(n):
+                _bgra_to_rgb(rgb, mv[stride * i:stride * (i + 1)])
+                dest(rgb)
+
+    def screenshot_ppm(self, f, **kw):
+        """ Write a screenshot to file ``f`` as a binary PPM """
+        from .screenshot import PPMWriter
+        self._screenshot_to(PPMWriter(f, self.w, self.h), kw)
+
+    def screenshot_png(self, f, **kw):
+        """ Write a screenshot to file ``f`` as a PNG """
+        from .screenshot import PNGWriter
+        self._screenshot_to(PNGWriter(f, self.w, self.h), kw)
+
+    def _screenshot_to(self, writer, kw):
+        self._screenshot(writer, **kw)
+        writer.close()
+
+    def screenshot_im(self, **kw):
+        stride = 3 * self.w
+        im = bytearray(stride * self.h)
+        y = 0
         def appender(s):
-            self.ssbytes += s
-        self.screenshot(appender)
+            nonlocal y
+            im[y:y + stride] = s
+            y += stride
+        self._screenshot(appender, **kw)
         from PIL import Image
-        return Image.frombytes("RGB", (self.w, self.h), self.ssbytes)
+        return Image.frombytes("RGB", (self.w, self.h), bytes(im))
 
-    def load(self, f):
-        while True:
-            s = f.read(512)
-            if not s:
-                return
-            self.cc(align4(s))
+    def load(self, f, dest = None):
+        """
+        Stream the file ``f`` to the coprocessor, as the data for a command
+        like ``cmd_loadimage`` or ``cmd_inflate``. If ``dest`` is given, the
+        file is instead written straight to memory at that address,
+        bypassing the command FIFO.
+
+        The transfer rate in bytes per second is left in ``load_rate``.
+
+        :return: the number of bytes loaded
+        """
+        self.flush()
+        if dest is None:
+            send = self.write
+        else:
+            def send(b):
+                self.write_from(dest + n, b)
+        t0 = time.monotonic()
+        n = 0
+
+        mm = _mmap(f)
+        if mm is not None:
+            with mm:
+                mv = memoryview(mm)[f.tell():]
+                end = len(mv) if dest is not None else (len(mv) & ~3)
+                while n < end:
+                    k = min(end - n, self._load_chunk(dest))
+                    send(mv[n:n + k])
+                    n += k
+                if n < len(mv):
+                    send(align4(bytes(mv[n:])))
+                    n = len(mv)
+                mv.release()
+            f.seek(0, 2)
+        else:
+            if self._loadbuf is None:
+                self._loadbuf = bytearray(self.LOAD_BUFSIZE)
+            buf = self._loadbuf
+            mv = memoryview(buf)
+            have = 0
+            while True:
+                k = f.readinto(mv[have:max(have + 4, self._load_chunk(dest))])
+                if not k:
+                    break
+                have += k
+                m = have & ~3           # the command FIFO takes whole words
+                send(mv[:m])
+                n += m
+                buf[:have - m] = buf[m:have]
+                have -= m
+            if have:
+                # Memory writes need no padding, the command FIFO does
+                send(mv[:have] if dest is not None else align4(bytes(buf[:have])))
+                n += have
+
+        dt = time.monotonic() - t0
+        self.load_rate = n / dt if dt else 0
+        return n
+
+    LOAD_BUFSIZE = 2048     # size of the buffer used by load() for reading
+
+    _loadbuf = None
+    load_rate = 0
+
+    def _load_chunk(self, dest):
+        # Read only what the FIFO can take now, so the write does not stall
+        m = self.max_transfer
+        if dest is not None:
+            return self.LOAD_BUFSIZE if m is None else (m - 4) & ~3
+        k = min(self.LOAD_BUFSIZE, max(self.WRITE_MIN, self.space & ~3))
+        return k if m is None else min(k, (m - 4) & ~3)
 
     def panel_800x480(self):
         self.register(self)
@@ -552,44 +1021,164 @@ class BaseEVE(_EVE):
             (REG_GPIOX,     0x8000 | 4),
             (REG_GPIOX_DIR, 0x8000 | 4),
         )
-        for (r, v) in settings:
-            self.cmd_regwrite(r, v)
+        with self.bus():
+            for (r, v) in settings:
+                self.cmd_regwrite(r, v)
 
-        self.finish()
+            self.finish()
 
-class MoviePlayer:
-    def __init__(self, gd, f, mf_base = 0xf0000, mf_size = 0x8000):
-        self.gd = gd
-        self.f = f
-        self.mf_base = mf_base
-        self.mf_size = mf_size
+class MediaFifo:
+    """
+    Streams files through the EVE's media FIFO, a ring buffer in RAM_G.
+
+    Each ``service()`` call refills the space the coprocessor has drained,
+    splitting writes at the end of the ring, and updates
+    ``REG_MEDIAFIFO_WRITE`` once. Data is read with ``readinto`` into a
+    reusable buffer, and chunks are sized from the measured drain rate.
+    ``underruns`` counts the times the FIFO was found empty while there
+    was more to send.
+    """
+
+    CHUNK_MIN = 512
+    CHUNK_MAX = 4096
+    LOOKAHEAD = 0.01        # seconds of measured drain to send per chunk
 
-        gd.cmd_mediafifo(mf_base, mf_size)
-        self.wp = 0
+    def __init__(self, gd, base = 0xf0000, size = 0x8000):
+        self.gd = gd
+        self.base = base
+        self.size = size
+        self.buf = bytearray(min(self.CHUNK_MAX, size))
+        self.mv = memoryview(self.buf)
+        self.rate = 0
+        self.underruns = 0
+        self.frames = 0
+
+        gd.cmd_mediafifo(base, size)
         gd.cmd_regwrite(REG_MEDIAFIFO_WRITE, 0)
+        self.wp = self.rp = 0
+        self.have = 0
+        self.f = None
+        self.started = False
+        self.eof = False        # the last stream has been sent completely
+        self.t = time.monotonic()
+
+    def stream(self, f):
+        """ Send file ``f`` next """
+        self.f = f
+        self.have = 0
+        self.started = False
+        self.eof = False
+        self.t = time.monotonic()
 
-    def play(self):
+    def service(self):
+        """ Top up the FIFO. Returns the number of bytes written """
+        gd = self.gd
+        rp = gd.rd32(REG_MEDIAFIFO_READ)
+        size = self.size
+        t = time.monotonic()
+        dt = t - self.t
+        if dt > 0:
+            self.rate = (3 * self.rate + ((rp - self.rp) % size) / dt) / 4
+        self.rp = rp
+        self.t = t
+        wp = self.wp
+        fullness = (wp - rp) % size
+        if self.f is None:
+            return 0
+        if fullness == 0 and self.started:
+            self.underruns += 1
+
+        chunk = int(self.rate * self.LOOKAHEAD) & ~3
+        chunk = min(len(self.buf), max(self.CHUNK_MIN, chunk))
+        free = size - 4 - fullness      # never fill completely: wp == rp means empty
+        written = 0
+        have = self.have                # 0-3 bytes carried over from the last read
+        while free >= min(chunk, size - wp):
+            k = min(free, chunk, size - wp)
+            n = self.f.readinto(self.mv[have:k])
+            if not n:
+                self.f = None
+                self.eof = True
+                if not have:
+                    break
+                # Only the end of the file is padded to a whole word
+                self.buf[have:4] = bytes(4 - have)
+                have = 4
+            else:
+                have += n
+            m = have & ~3
+            if m:
+                gd.write_from(self.base + wp, self.mv[:m])
+                wp = (wp + m) % size
+                free -= m
+                written += m
+                self.buf[:have - m] = self.buf[m:have]
+                have -= m
+            if self.f is None:
+                break
+        self.have = have
+        if written:
+            self.wp = wp
+            self.started = True
+            gd.wr32(REG_MEDIAFIFO_WRITE, wp)
+        return written
+
+    def run(self, f):
+        """ Send ``f`` until the coprocessor finishes the command using it """
         gd = self.gd
-        gd.cmd_playvideo(OPT_MEDIAFIFO | OPT_FULLSCREEN | OPT_NOTEAR)
+        self.stream(f)
         gd.cmd_nop()
-        gd.flush()
+        gd.push()
+        f0 = gd.rd32(REG_FRAMES)
         while not gd.is_idle():
-            self.service()
+            if not self.service():
+                time.sleep(gd.POLL_MAX)
         gd.finish()
-        
-    def service(self):
+        self.frames += (gd.rd32(REG_FRAMES) - f0)
+
+    async def run_async(self, f):
+        import asyncio
         gd = self.gd
+        self.stream(f)
+        gd.cmd_nop()
+        await gd.push_async()
+        f0 = gd.rd32(REG_FRAMES)
+        while not gd.is_idle():
+            self.service()
+            await asyncio.sleep(gd.POLL_MAX)
+        await gd.finish_async()
+        self.frames += (gd.rd32(REG_FRAMES) - f0)
 
-        rp = gd.rd32(REG_MEDIAFIFO_READ)
-        fullness = (self.wp - rp) % self.mf_size
-        SZ = 2048
-        # print("rp=%x wp=%x" % (rp, self.wp))
-        while fullness < (self.mf_size - SZ):
-            s = self.f.read(SZ)
-            if not s:
-                return
-            # print("Writing %x to %x" % (len(s), self.mf_base + self.wp))
-            gd.wr(self.mf_base + self.wp, s)
-            self.wp = (self.wp + len(s)) % self.mf_size
-            gd.wr32(REG_MEDIAFIFO_WRITE, self.wp)
-            fullness += len(s)
+    def underruns_per_frame(self):
+        return self.underruns / self.frames if self.frames else 0
+
+    def loadimage(self, ptr, f, options = 0):
+        """ Decode a JPEG or PNG from ``f`` to ``ptr`` """
+        self.gd.cmd_loadimage(ptr, options | OPT_MEDIAFIFO)
+        self.run(f)
+
+    def inflate(self, ptr, f):
+        """ Decompress zlib data from ``f`` to ``ptr`` """
+        self.gd.cmd_inflate2(ptr, OPT_MEDIAFIFO)
+        self.run(f)
+
+class MoviePlayer:
+    def __init__(self, gd, f, mf_base = 0xf0000, mf_size = 0x8000):
+        self.gd = gd
+        self.f = f
+        self.mf_base = mf_base
+        self.mf_size = mf_size
+        self.fifo = MediaFifo(gd, mf_base, mf_size)
+
+    def play(self):
+        self.gd.cmd_playvideo(OPT_MEDIAFIFO | OPT_FULLSCREEN | OPT_NOTEAR)
+        self.fifo.run(self.f)
+
+    async def play_async(self):
+        self.gd.cmd_playvideo(OPT_MEDIAFIFO | OPT_FULLSCREEN | OPT_NOTEAR)
+        await self.fifo.run_async(self.f)
+
+    def service(self):
+        if self.fifo.f is None and not self.fifo.eof:
+            self.fifo.stream(self.f)
+        return self.fifo.service()
@@ -0,0 +1,128 @@
+import time
+
+from .registers import (
+    INT_CMDEMPTY,
+    INT_SWAP,
+    INT_TAG,
+    INT_TOUCH,
+    REG_INT_EN,
+    REG_INT_FLAGS,
+    REG_INT_MASK,
+)
+
+class Events:
+    """
+    Dispatches EVE interrupts to callbacks and waiters.
+
+    ``REG_INT_FLAGS`` clears when read, so ``poll()`` reads it once and
+    hands the flags to every callback registered with ``on()`` for those
+    bits. They are also queued for ``get_async()``.
+
+    If the EVE's INT_N line is wired to ``pin``, the flags are only read
+    when it is asserted. A ``countio.Counter`` on the falling edge is used
+    where available, otherwise the pin level is read with ``digitalio``.
+    Without a pin every ``poll()`` reads the register.
+
+    ``finish()`` and ``wait()`` sleep between checks instead of
+    spinning on ``REG_CMDB_SPACE``.
+
+    :param gd: the BaseEVE
+    :param mask: the ``INT_*`` bits that raise INT_N
+    :param pin: the pin connected to INT_N, or None to poll
+    """
+
+    QUEUE_MAX = 16
+    IDLE_CHECK = 0.01       # longest finish() sleeps before checking the FIFO itself
+
+    def __init__(self, gd, mask = INT_SWAP | INT_TOUCH | INT_TAG | INT_CMDEMPTY, pin = None):
+        self.gd = gd
+        self.mask = mask
+        self.callbacks = []
+        self.queue = []
+        self.counter = self.io = None
+        if pin is not None:
+            import digitalio
+            # INT_N is open-drain, so both ways of watching it pull it up
+            try:
+                import countio
+                self.counter = countio.Counter(pin, edge = countio.Edge.FALL, pull = digitalio.Pull.UP)
+            except (ImportError, AttributeError):
+                self.io = digitalio.DigitalInOut(pin)
+                self.io.direction = digitalio.Direction.INPUT
+                self.io.pull = digitalio.Pull.UP
+        gd.wr32(REG_INT_MASK, mask)
+        gd.rd32(REG_INT_FLAGS)
+        gd.wr32(REG_INT_EN, 1)
+
+    def close(self):
+        """ Disable the interrupt and release the pin """
+        self.gd.wr32(REG_INT_EN, 0)
+        for p in (self.counter, self.io):
+            if p is not None:
+                p.deinit()
+
+    def on(self, bits, fn):
+        """ Call ``fn(flags)`` whenever any of the ``INT_*`` ``bits`` is seen """
+        self.callbacks.append((bits, fn))
+
+    def pending(self):
+        """ True if INT_N says there may be flags to read """
+        if self.counter is not None:
+            if self.counter.count:
+                self.counter.reset()
+                return True
+            # The line stays low until the flags are read
+            return False
+        if self.io is not None:
+            return not self.io.value
+        return True
+
+    def poll(self):
+        """ Read and clear ``REG_INT_FLAGS``, dispatching any flags set """
+        if not self.pending():
+            return 0
+        flags = self.gd.rd32(REG_INT_FLAGS) & self.mask
+        if flags:
+            for (bits, fn) in self.callbacks:
+                if bits & flags:
+                    fn(flags)
+            if len(self.queue) == self.QUEUE_MAX:
+                self.queue.pop(0)
+            self.queue.append(flags)
+        return flags
+
+    def wait(self, bits, timeout = None):
+        """ Sleep until one of ``bits`` is flagged. Returns the flags, or 0 on timeout """
+        t0 = time.monotonic()
+        while True:
+            flags = self.poll()
+            if flags & bits:
+                return flags
+            if timeout is not None and time.monotonic() - t0 > timeout:
+                return 0
+            time.sleep(self.gd.POLL_MAX)
+
+    def finish(self):
+        """ Like ``BaseEVE.finish``, but sleeps until the FIFO empties """
+        gd = self.gd
+        gd.push()
+        while not gd.is_idle():
+            # Bounded, since INT_CMDEMPTY is never seen if it is not in mask
+            self.wait(INT_CMDEMPTY, self.IDLE_CHECK)
+
+    async def wait_async(self, bits):
+        import asyncio
+        while True:
+            flags = self.poll()
+            if flags & bits:
+                return flags
+            await asyncio.sleep(self.gd.POLL_MAX)
+
+    async def get_async(self):
+        """ The next flags seen, in order """
+        import asyncio
+        while not self.queue:
+            self.poll()
+            if not self.queue:
+                await asyncio.sleep(self.gd.POLL_MAX)
+        return self.queue.pop(0)
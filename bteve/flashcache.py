@@ -0,0 +1,133 @@
+import struct
+import binascii
+
+from .registers import RAM_G_SIZE
+
+_MAGIC = b"BTFC"
+_HEADER = struct.Struct("<4sII")        # magic, entry count, CRC of entries
+_ENTRY = struct.Struct("<IIII")         # content CRC, length, flash address, reserved
+_SECTOR = 4096
+_MAX_ENTRIES = (_SECTOR - _HEADER.size) // _ENTRY.size
+
+def _sectors(n):
+    return (n + _SECTOR - 1) & ~(_SECTOR - 1)
+
+def content_crc(f, bufsize = 2048):
+    """
+    CRC-32 and length of the rest of file ``f``. The file position is
+    restored afterwards.
+    """
+    pos = f.tell()
+    buf = bytearray(bufsize)
+    mv = memoryview(buf)
+    crc = 0
+    n = 0
+    while True:
+        k = f.readinto(buf)
+        if not k:
+            break
+        crc = binascii.crc32(mv[:k], crc)
+        n += k
+    f.seek(pos)
+    return (crc & 0xffffffff, n)
+
+class FlashCache:
+    """
+    A persistent cache of RAM_G assets in the EVE's flash, indexed by
+    content CRC-32.
+
+    ``load`` looks the asset up in the index. If flash has a copy, it is
+    read into RAM_G with ``cmd_flashread`` and checked with ``cmd_memcrc``,
+    so nothing is sent over SPI. Otherwise the asset is uploaded and stored
+    in flash for next time.
+
+    The index occupies the first sector of the region. When the region is
+    full, the cache is emptied and refilled.
+
+    :param gd: the BaseEVE
+    :param base: start of the flash region, a multiple of 4096
+    :param size: size of the flash region in bytes
+    :param scratch: a 4 KB RAM_G area used for reading and writing the index
+    """
+
+    def __init__(self, gd, base = 0x100000, size = 0x100000, scratch = RAM_G_SIZE - _SECTOR):
+        assert (base % _SECTOR) == 0, "Flash region must be sector-aligned"
+        self.gd = gd
+        self.base = base
+        self.size = size
+        self.scratch = scratch
+        self.hits = 0
+        self.misses = 0
+        self.open()
+
+    def open(self):
+        """ Put the flash in full-speed mode and read the index """
+        gd = self.gd
+        gd.cmd_flashattach()
+        gd.cmd_flashfast()
+        gd.cmd_flashread(self.scratch, self.base, _SECTOR)
+        gd.finish()
+        self.entries = self._parse(gd.rd(self.scratch, _SECTOR))
+
+    def _parse(self, b):
+        (magic, n, crc) = _HEADER.unpack_from(b, 0)
+        body = b[_HEADER.size:_HEADER.size + n * _ENTRY.size]
+        if magic != _MAGIC or n > _MAX_ENTRIES or crc != (binascii.crc32(body) & 0xffffffff):
+            return {}
+        entries = {}
+        for i in range(n):
+            (ccrc, length, addr, _) = _ENTRY.unpack_from(body, i * _ENTRY.size)
+            entries[(ccrc, length)] = addr
+        return entries
+
+    def _write_index(self):
+        body = bytearray(len(self.entries) * _ENTRY.size)
+        for (i, ((ccrc, length), addr)) in enumerate(self.entries.items()):
+            _ENTRY.pack_into(body, i * _ENTRY.size, ccrc, length, addr, 0)
+        gd = self.gd
+        gd.finish()
+        gd.write_from(self.scratch, _HEADER.pack(_MAGIC, len(self.entries), binascii.crc32(body) & 0xffffffff) + body)
+        gd.cmd_flashupdate(self.base, self.scratch, _SECTOR)
+
+    def _place(self, length):
+        # Flash address for a new asset, emptying the cache if it is full
+        need = _sectors(length)
+        assert need <= self.size - _SECTOR, "Asset larger than flash cache"
+        ptr = self.base + _SECTOR
+        for ((_, n), addr) in self.entries.items():
+            ptr = max(ptr, addr + _sectors(n))
+        if ptr + need > self.base + self.size or len(self.entries) == _MAX_ENTRIES:
+            self.entries = {}
+            ptr = self.base + _SECTOR
+        return ptr
+
+    def load(self, f, dest, crc = None):
+        """
+        Load the rest of file ``f`` into RAM_G at ``dest``, using the flash
+        copy if there is a good one.
+
+        :param crc: the content's ``(crc32, length)``, if already known
+        :return: True if the asset came from flash
+        """
+        gd = self.gd
+        if crc is None:
+            crc = content_crc(f)
+        (ccrc, length) = crc
+        addr = self.entries.get(crc)
+        if addr is not None:
+            gd.cmd_flashread(dest, addr, (length + 3) & ~3)
+            gd.cmd_memcrc(dest, length, 0)
+            if gd.result() == ccrc:
+                self.hits += 1
+                return True
+            del self.entries[crc]
+
+        self.misses += 1
+        assert dest + _sectors(length) <= RAM_G_SIZE, "flashupdate source runs past RAM_G"
+        gd.load(f, dest)
+        addr = self._place(length)
+        gd.cmd_flashupdate(addr, dest, _sectors(length))
+        self.entries[crc] = addr
+        self._write_index()
+        gd.finish()
+        return False
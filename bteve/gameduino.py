@@ -1,13 +1,10 @@
 import sys
 import time
 import struct
+import binascii
 from collections import namedtuple
 
-if sys.implementation.name == 'circuitpython':
-    from _eve import _EVE
-else:
-    from ._eve import _EVE
-from .eve import EVE
+from . import EVE
 from .registers import *
 
 if sys.implementation.name != "circuitpython":
@@ -25,8 +22,10 @@ REG_PWM_HZ = 0x3020d0
 
 FIFO_MAX = const(0xffc)    # Maximum reported free space in the EVE command FIFO
 
-class CoprocessorException(Exception):
-    pass
+FLASH_CONFIG = const(0x1000)       # Flash address of the startup config block
+FLASH_CONFIG_SIZE = const(512)     # Bytes of coprocessor commands in the config
+FLASH_SIGNATURE = const(0x7C6A0100)
+FLASH_STATUS_INIT = const(0)
 
 """
 Adapted from https://github.com/jfurcean/CircuitPython_WiiChuck.git
@@ -165,10 +164,62 @@ class ClassicController:
             (self.buffer[2] & 0x60) >> 2 | (self.buffer[3] & 0xE0) >> 5,  # left
         )
 
-class Gameduino(_EVE, EVE):
-    def init(self):
+def _load_config(cache):
+    # The cached config is its CRC-32 then its bytes, in a file or an
+    # NVM-like byte array such as microcontroller.nvm
+    n = 4 + FLASH_CONFIG_SIZE
+    try:
+        if isinstance(cache, str):
+            with open(cache, "rb") as f:
+                b = f.read(n)
+        else:
+            b = bytes(cache[0:n])
+    except OSError:
+        return None
+    if len(b) != n:
+        return None
+    (crc,) = struct.unpack("<I", b[:4])
+    cfg = b[4:]
+    if binascii.crc32(cfg) != crc:
+        return None     # blank or corrupt
+    return (crc, cfg)
+
+def _save_config(cache, cfg):
+    b = struct.pack("<I", binascii.crc32(cfg)) + cfg
+    try:
+        if isinstance(cache, str):
+            with open(cache, "wb") as f:
+                f.write(b)
+        else:
+            cache[0:len(b)] = b
+    except OSError:
+        # For example a read-only CircuitPython filesystem
+        pass
+
+class Gameduino(EVE):
+    fast = False            # default for init(): poll for readiness instead of sleeping
+    boot_times = None       # (phase, seconds) of the last fast boot
+    t_reset = None          # time.monotonic() when the reset pin was released
+
+    def init(self, fast = None, cache = None):
+        """
+        Start the EVE and load the flash config.
+
+        With ``fast`` the fixed startup sleeps are replaced by polling, and
+        the time spent in each phase goes in ``boot_times``. With ``cache``,
+        a file path or a byte array such as ``microcontroller.nvm``, the
+        flash config is kept on the host. Later boots then check it with
+        ``cmd_memcrc`` against a 512-byte flash read instead of reading
+        back 4 Kbytes.
+        """
+        if fast is None:
+            fast = self.fast
         self.register(self)
 
+        if fast:
+            self.fast_startup(cache)
+            return
+
         self.coldstart()
 
         # self.bringup()
@@ -228,61 +279,78 @@ class Gameduino(_EVE, EVE):
         self.cmd_regwrite(REG_GPIO, 0x83)
         time.sleep(.1)
 
-    def _addr(self, a):
-        return struct.pack(">I", a)[1:]
-
-    def rd(self, a, n):
-        return self.transfer(self._addr(a), 1 + n)[1:]
-
-    def wr(self, a, v):
-        self.transfer(self._addr(0x800000 | a) + v)
-
-    def rd32(self, a):
-        return struct.unpack("<I", self.rd(a, 4))[0]
-
-    def wr32(self, a, v):
-        self.wr(a, struct.pack("I", v))
-
-    def getspace(self):
-        self.space = self.rd32(REG_CMDB_SPACE)
-        if self.space & 1:
-            raise CoprocessorException
-
-    def reserve(self, n):
-        while self.space < n:
-            self.getspace()
+    def wii_classic_pro(self, b):
+        return ClassicController(b)
 
-    def is_finished(self):
-        self.getspace()
-        return self.space == FIFO_MAX
-            
-    def write(self, ss):
-        self.reserve(len(ss))
-        self.wr(REG_CMDB_WRITE, ss)
-        self.space -= len(ss)
-        return
-
-
-        # Write ss to the command FIFO
-        for i in range(0, len(ss), 64):
-            s = ss[i:i + 64]
-            self.reserve(len(s))
-            self.wr(REG_CMDB_WRITE, s)
-            self.space -= len(s)
-
-    def finish(self):
-        self.flush()
-        self.reserve(FIFO_MAX)
-
-    def is_idle(self):
+    def _wake(self, timeout = 2.0, retry = 0.05):
+        # Without the settle time after reset, the first host command may
+        # arrive before the EVE is listening, so ACTIVE is repeated until
+        # it answers. The core reset is sent only once: repeating it
+        # would restart a boot still in progress.
+        t0 = t = time.monotonic()
+        self.coldstart()
+        while self.rd32(REG_ID) != 0x7c:
+            now = time.monotonic()
+            assert (now - t0) < timeout, "No response - is device attached?"
+            if now - t >= retry:
+                self.host_cmd(0x00)     # Wake up
+                t = now
+
+    def fast_startup(self, cache = None):
+        """
+        ``standard_startup`` without its sleeps, recording ``boot_times``.
+        See ``init``.
+        """
+        times = []
+        t0 = t = time.monotonic()
+        if self.t_reset is not None:
+            times.append(("reset", t - self.t_reset))
+        def phase(name):
+            nonlocal t
+            now = time.monotonic()
+            times.append((name, now - t))
+            t = now
+
+        self._wake()
         self.getspace()
-        return self.space == FIFO_MAX
+        phase("wake")
 
-    def wii_classic_pro(self, b):
-        return ClassicController(b)
+        # Until the EVE has probed its flash, REG_FLASH_STATUS is 0
+        while self.rd32(REG_FLASH_STATUS) == FLASH_STATUS_INIT:
+            assert (time.monotonic() - t) < 1.0, "Flash did not start"
+        self.Clear(1,1,1)
+        self.swap()
+        phase("flash")
+
+        cfg = None
+        cached = _load_config(cache) if cache is not None else None
+        if cached is not None:
+            self.cmd_flashread(0, FLASH_CONFIG, FLASH_CONFIG_SIZE)
+            self.cmd_memcrc(0, FLASH_CONFIG_SIZE, 0)
+            if self.result() == cached[0]:
+                cfg = cached[1]
+        hit = cfg is not None
+        if not hit:
+            self.cmd_flashread(0, FLASH_CONFIG, 0x1000)
+            self.finish()
+            if self.rd32(0xffc) == FLASH_SIGNATURE:
+                cfg = self.rd(0, FLASH_CONFIG_SIZE)
+                if cache is not None:
+                    _save_config(cache, cfg)
+            else:
+                print('*** Did not find flash config ***')
+        phase("cached" if hit else "flashread")
+
+        if cfg is not None:
+            self.cc(cfg)
+        self.finish()
+        self.w = self.rd32(REG_HSIZE)
+        self.h = self.rd32(REG_VSIZE)
+        phase("replay")
 
-    def result(self, n=1):
-        # Return the result field of the preceding command
+        self.cmd_regwrite(REG_GPIO, 0x83)
         self.finish()
-        wp = self.rd32(REG_CMD_READ)
-        return self.rd32(RAM_CMD + (4095 & (wp - 4 * n)))
+        phase("display")
+
+        times.append(("total", t - (t0 if self.t_reset is None else self.t_reset)))
+        self.boot_times = times
@@ -6,47 +6,43 @@ import sdcardio
 import storage
 import time
 
+from . import spilock
 from .gameduino import Gameduino
 
-def spilock(f):
-    def wrapper(*args):
-        spi = args[0].sp
-        while not spi.try_lock():
-            pass
-        r = f(*args)
-        spi.unlock()
-        return r
-    return wrapper
-
 def pin(p):
     r = digitalio.DigitalInOut(p)
     r.direction = digitalio.Direction.OUTPUT
     r.value = True
     return r
 
-def reset(p):
+def reset(p, fast = False):
+    # With fast, skip the settle time: Gameduino.init(fast = True)
+    # polls until the EVE answers instead
     pgm = pin(p)
     pgm.value = False
-    time.sleep(.1)
+    time.sleep(.02 if fast else .1)
     pgm.value = True
-    time.sleep(.6)
+    if not fast:
+        time.sleep(.6)
+    return time.monotonic()
 
 class GameduinoCircuitPython(Gameduino):
-    def __init__(self):
+    def __init__(self, fast = False):
+        self.fast = fast
         mach = os.uname().machine
         if mach == 'Raspberry Pi Pico with rp2040':
             self.sp = busio.SPI(board.GP2, MOSI=board.GP3, MISO=board.GP4)
             cs = (board.GP5, board.GP6, board.GP7)
-            reset(board.GP10)
+            self.t_reset = reset(board.GP10, fast)
         elif (mach.startswith("Adafruit Feather M4 Express") or
               mach.startswith("Adafruit Feather M4 CAN")):
             self.sp = busio.SPI(board.SCK, MOSI=board.MOSI, MISO=board.MISO)
             cs = (board.D4, board.D5, board.D6)
-            reset(board.D9)
+            self.t_reset = reset(board.D9, fast)
         elif mach.startswith("Teensy 4."):
             self.sp = busio.SPI(board.D13, MOSI=board.D11, MISO=board.D12)
             cs = (board.D8, board.D9, board.D10)
-            reset(board.D16)
+            self.t_reset = reset(board.D16, fast)
         else:
             # Adafruit Metro M4 Express
             # follows the Arduino pin numbering
@@ -68,9 +64,8 @@ class GameduinoCircuitPython(Gameduino):
         storage.mount(self.vfs, "/sd")
         return True
 
-    @spilock
-    def setup_spi(self):
-        self.sp.configure(baudrate=8000000, phase=0, polarity=0)
+    def setup_spi(self, speed = 8_000_000):
+        self.configure_spi(speed)
 
     @spilock
     def dazzler(self, cmd, n = 0):
@@ -83,20 +78,17 @@ class GameduinoCircuitPython(Gameduino):
         return bb
         
     @spilock
-    def controllers(self):
+    def read_controllers(self, bb):
         self.daz.value = False
-        bb = bytearray(26)
         self.sp.readinto(bb)
         self.daz.value = True
-        return (self.wii_classic_pro(bb[2:8]), self.wii_classic_pro(bb[14:20]))
-    
-    @spilock
-    def transfer(self, wr, rd = 0):
-        self.cs.value = False
-        self.sp.write(wr)
-        r = None
-        if rd != 0:
-            r = bytearray(rd)
-            self.sp.readinto(r)
-        self.cs.value = True
-        return r
+
+    _controllers = None
+
+    def controllers(self):
+        """ The two controllers' ``ControllerState``, updated in place by each call """
+        if self._controllers is None:
+            from .controllers import Controllers
+            self._controllers = Controllers(self)
+        return self._controllers.poll()
+
@@ -0,0 +1,81 @@
+import struct
+
+from .registers import REG_TAG, REG_TOUCH_RAW_XY, REG_TRACKER
+
+_TOUCH = struct.Struct("<HHIhhhhB")     # REG_TOUCH_RAW_XY .. REG_TOUCH_TAG
+
+class Inputs:
+    """ One sample of the touch and tracker registers """
+
+    __slots__ = (
+        "rawy", "rawx", "rz", "y", "x", "tag_y", "tag_x", "tag",
+        "query_tag", "tracker_tag", "tracker_val",
+        "touching", "press", "release", "press_tag", "release_tag",
+    )
+
+    def __init__(self):
+        self.touching = self.press = self.release = False
+        self.press_tag = self.release_tag = 0
+
+class InputSampler:
+    """
+    Samples touch input without waiting for the coprocessor.
+
+    ``get_inputs()`` calls ``finish()`` first, which stalls frame building.
+    ``sample()`` instead reads ``REG_TOUCH_*``, ``REG_TAG`` and, optionally,
+    ``REG_TRACKER`` directly, in short SPI bursts, so it can be called at any
+    rate while commands are still queued. It fills and returns the same
+    ``Inputs`` object each time.
+
+    ``press`` and ``release`` are true on the sample where the touch starts
+    or ends. ``press_tag`` is the tag under the touch when it started, and
+    ``release_tag`` the last tag under it before it ended.
+
+    ``query_tag`` is ``REG_TAG``, the tag at ``REG_TAG_X``/``REG_TAG_Y``.
+
+    :param gd: the BaseEVE
+    :param tracker: also read ``REG_TRACKER``
+    """
+
+    def __init__(self, gd, tracker = True):
+        self.gd = gd
+        self.tracker = tracker
+        self.buf = bytearray(_TOUCH.size)
+        self.qbuf = bytearray(4)
+        self.tbuf = bytearray(4)
+        self.inputs = Inputs()
+        self.inputs.tracker_tag = self.inputs.tracker_val = 0
+        self.samples = 0
+        self.last_tag = 0
+
+    def sample(self):
+        gd = self.gd
+        i = self.inputs
+        buf = self.buf
+        # Separate bursts, because a single one from REG_TAG to
+        # REG_TOUCH_TAG would also read REG_INT_FLAGS, which clears
+        # the pending interrupts when read
+        with gd.bus():
+            gd.readinto(REG_TOUCH_RAW_XY, buf)
+            gd.readinto(REG_TAG, self.qbuf)
+            if self.tracker:
+                gd.readinto(REG_TRACKER, self.tbuf)
+        (i.rawy, i.rawx, i.rz, i.y, i.x, i.tag_y, i.tag_x, i.tag) = _TOUCH.unpack_from(buf)
+        i.query_tag = self.qbuf[0]
+        if self.tracker:
+            v = int.from_bytes(self.tbuf, "little")
+            i.tracker_tag = v & 0xffff
+            i.tracker_val = v >> 16
+
+        touching = (i.x != -32768)
+        i.press = touching and not i.touching
+        i.release = i.touching and not touching
+        if i.press:
+            i.press_tag = i.tag
+        if touching:
+            self.last_tag = i.tag
+        elif i.release:
+            i.release_tag = self.last_tag
+        i.touching = touching
+        self.samples += 1
+        return i
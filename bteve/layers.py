@@ -0,0 +1,151 @@
+from .registers import ARGB4, BITMAPS, RAM_DL, REG_CMD_DL
+
+class LayerCache:
+    """
+    Caches static parts of a frame as display list fragments in RAM_G.
+
+    A layer is drawn by a function ``fn(gd, *args)``. The first time it is
+    drawn, or when ``args`` change, the display list it generates is copied
+    from RAM_DL into a slot in RAM_G. On later frames the whole layer is
+    replayed with a single ``cmd_append``. ``evict_unused()`` frees the
+    slots of layers that are no longer drawn.
+
+    Layer functions should leave the graphics state as they found it, for
+    example with ``SaveContext``/``RestoreContext``, and take immutable
+    arguments, since they are compared with ``==`` to detect changes.
+
+    :param gd: the BaseEVE to draw on
+    :param base: start of the RAM_G region used for fragments
+    :param size: size of the RAM_G region in bytes
+    """
+
+    def __init__(self, gd, base, size):
+        self.gd = gd
+        self.base = base
+        self.size = size
+        self.invalidate()
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self):
+        """ Forget all recorded layers """
+        self.slots = {}
+        self.free = []      # (address, capacity) of evicted slots
+        self.ptr = self.base
+
+    def draw(self, fn, *args, key = None):
+        """
+        Draw the layer ``fn(gd, *args)``, replaying it if unchanged.
+
+        Layers are told apart by ``key``, by default ``(fn, args)``, so one
+        function can draw several layers in a frame. With a key of its own,
+        a layer whose ``args`` change is recorded again in the same slot.
+        """
+        gd = self.gd
+        if key is None:
+            key = (fn, args)
+        slot = self.slots.get(key)
+        if slot is not None and slot[3] == args:
+            self.hits += 1
+            slot[4] = True
+            if slot[1]:
+                gd.cmd_append(slot[0], slot[1])
+            return
+
+        self.misses += 1
+        gd.finish()
+        start = gd.rd32(REG_CMD_DL)
+        fn(gd, *args)
+        gd.finish()
+        n = gd.rd32(REG_CMD_DL) - start
+
+        if slot is None or slot[2] < n:
+            self.evict(key)
+            slot = self._allocate(key, n)
+        slot[1] = n
+        slot[3] = args
+        slot[4] = True
+        gd.cmd_memcpy(slot[0], RAM_DL + start, n)
+
+    def evict(self, key):
+        """ Forget the layer ``key``, so its slot can be reused """
+        slot = self.slots.pop(key, None)
+        if slot is not None:
+            self.free.append((slot[0], slot[2]))
+
+    def evict_unused(self):
+        """ Forget the layers not drawn since the last call, for example once per frame """
+        for (key, slot) in list(self.slots.items()):
+            if slot[4]:
+                slot[4] = False
+            else:
+                self.evict(key)
+
+    def _allocate(self, key, n):
+        for (i, (a, c)) in enumerate(self.free):
+            if c >= n:
+                del self.free[i]
+                slot = [a, 0, c, None, True]
+                break
+        else:
+            if self.ptr + n > self.base + self.size:
+                self.invalidate()
+                assert n <= self.size, "Layer does not fit in cache"
+            slot = [self.ptr, 0, n, None, True]     # address, used, capacity, args, drawn
+            self.ptr += n
+        self.slots[key] = slot
+        return slot
+
+class FlatLayer:
+    """
+    A static layer flattened into a bitmap in RAM_G.
+
+    A replayed display list fragment still occupies RAM_DL, so a layer
+    too large for it, such as a dense plot, cannot be cached that way.
+    ``render`` instead draws the layer on its own and captures the
+    rectangle ``x, y, w, h`` with ``cmd_snapshot2``. ``draw`` then shows the
+    capture for a few display list words, however much the layer holds.
+
+    Call ``render`` between frames, just after ``swap()``, since it shows
+    the layer alone for one frame. Layers should clear to transparent, for
+    example with ``ClearColorA(0)``, to be composited with the default
+    ``ARGB4`` format. ``args`` holds the arguments of the last render, to
+    tell when it is out of date.
+
+    :param gd: the BaseEVE to draw on
+    :param ptr: RAM_G address for the bitmap, of ``2 * w * h`` bytes
+    :param handle: the bitmap handle that ``draw`` uses
+    """
+
+    def __init__(self, gd, ptr, x, y, w, h, format = ARGB4, handle = 15):
+        self.gd = gd
+        self.ptr = ptr
+        self.rect = (x, y, w, h)
+        self.format = format
+        self.handle = handle
+        self.args = None
+
+    def render(self, fn, *args):
+        """ Capture the layer ``fn(gd, *args)`` """
+        gd = self.gd
+        gd.cmd_dlstart()
+        gd.ClearColorA(0)
+        gd.Clear()
+        fn(gd, *args)
+        gd.Display()
+        gd.cmd_swap()
+        gd.cmd_snapshot2(self.format, self.ptr, *self.rect)
+        gd.cmd_dlstart()
+        gd.cmd_loadidentity()
+        self.args = args
+
+    def draw(self):
+        """ Show the captured layer """
+        gd = self.gd
+        (x, y, w, h) = self.rect
+        gd.SaveContext()
+        gd.BitmapHandle(self.handle)
+        gd.cmd_setbitmap(self.ptr, self.format, w, h)
+        gd.Begin(BITMAPS)
+        gd.Vertex2f(x, y)
+        gd.RestoreContext()
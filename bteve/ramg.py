@@ -0,0 +1,158 @@
+from .eve import MoviePlayer
+from .registers import ASTC_4x4, RAM_G_SIZE
+
+def bitmap_align(format):
+    """ The alignment in bytes required for bitmap data of ``format`` """
+    if format >= ASTC_4x4:
+        return 16
+    return 4
+
+class _Allocation:
+    __slots__ = ("addr", "size", "fetch", "used")
+
+    def __init__(self, addr, size, fetch, used):
+        self.addr = addr
+        self.size = size
+        self.fetch = fetch
+        self.used = used
+
+class RamG:
+    """
+    Allocator for the EVE's RAM_G, with named allocations.
+
+    Allocations made with ``alloc`` stay until freed. Assets made with
+    ``asset``, ``image`` and ``inflate`` know how to re-fetch their contents,
+    so when space runs out the least recently used ones are evicted.
+    An evicted asset may come back at a different address, so look the
+    address up each time it is used.
+
+    :param gd: the BaseEVE that owns the memory
+    :param base: start of the managed region
+    :param size: size of the managed region in bytes
+    """
+
+    def __init__(self, gd, base = 0, size = RAM_G_SIZE):
+        self.gd = gd
+        self.base = base
+        self.size = size
+        self.free_blocks = [[base, size]]   # sorted by address
+        self.allocations = {}
+        self.clock = 0
+        self.evictions = 0
+
+    def __contains__(self, name):
+        return name in self.allocations
+
+    def __getitem__(self, name):
+        return self.allocations[name].addr
+
+    def alloc(self, name, size, align = 4):
+        """ Allocate ``size`` bytes named ``name``, returning the address """
+        return self._alloc(name, size, align, None)
+
+    def free(self, name):
+        """ Release the allocation ``name`` """
+        a = self.allocations.pop(name)
+        self._release(a.addr, a.size)
+
+    def asset(self, name, size, fetch, align = 4):
+        """
+        Make the asset ``name`` resident, calling ``fetch(addr)`` to load
+        it if it is not. Returns its address.
+        """
+        a = self.allocations.get(name)
+        if a is None:
+            addr = self._alloc(name, size, align, fetch)
+            fetch(addr)
+            a = self.allocations[name]
+        self.clock += 1
+        a.used = self.clock
+        return a.addr
+
+    def image(self, name, filename, size, options = 0, align = 4):
+        """ A JPEG or PNG asset, decoded by ``cmd_loadimage`` into ``size`` bytes """
+        def fetch(addr):
+            self.gd.cmd_loadimage(addr, options)
+            with open(filename, "rb") as f:
+                self.gd.load(f)
+        return self.asset(name, size, fetch, align)
+
+    def inflate(self, name, filename, size, align = 4):
+        """ A zlib-compressed asset, expanded by ``cmd_inflate`` into ``size`` bytes """
+        def fetch(addr):
+            self.gd.cmd_inflate(addr)
+            with open(filename, "rb") as f:
+                self.gd.load(f)
+        return self.asset(name, size, fetch, align)
+
+    def movie(self, f, mf_size = 0x8000, name = "mediafifo"):
+        """ A MoviePlayer for ``f`` with its media FIFO allocated here """
+        if name in self.allocations:
+            self.free(name)
+        return MoviePlayer(self.gd, f, self.alloc(name, mf_size), mf_size)
+
+    def stats(self):
+        """ Usage and fragmentation of the managed region """
+        free = sum(s for (_, s) in self.free_blocks)
+        largest = max([s for (_, s) in self.free_blocks] or [0])
+        return {
+            "size": self.size,
+            "used": self.size - free,
+            "free": free,
+            "largest_free": largest,
+            "free_blocks": len(self.free_blocks),
+            "fragmentation": (1 - largest / free) if free else 0.0,
+            "allocations": len(self.allocations),
+            "evictions": self.evictions,
+        }
+
+    def _alloc(self, name, size, align, fetch):
+        if name in self.allocations:
+            self.free(name)
+        size = (size + 3) & ~3
+        while True:
+            addr = self._fit(size, align)
+            if addr is not None:
+                break
+            if not self._evict():
+                raise MemoryError("RAM_G: no room for %r (%d bytes)" % (name, size))
+        self.allocations[name] = _Allocation(addr, size, fetch, self.clock)
+        return addr
+
+    def _fit(self, size, align):
+        # Best fit: the smallest free block that can hold the aligned request
+        best = None
+        for (i, (a, s)) in enumerate(self.free_blocks):
+            start = (a + align - 1) & -align
+            if start + size <= a + s and (best is None or s < self.free_blocks[best][1]):
+                best = i
+        if best is None:
+            return None
+        (a, s) = self.free_blocks.pop(best)
+        start = (a + align - 1) & -align
+        end = start + size
+        if end < a + s:
+            self.free_blocks.insert(best, [end, a + s - end])
+        if a < start:
+            self.free_blocks.insert(best, [a, start - a])
+        return start
+
+    def _release(self, addr, size):
+        fb = self.free_blocks
+        i = 0
+        while i < len(fb) and fb[i][0] < addr:
+            i += 1
+        fb.insert(i, [addr, size])
+        if i + 1 < len(fb) and fb[i][0] + fb[i][1] == fb[i + 1][0]:
+            fb[i][1] += fb.pop(i + 1)[1]
+        if i > 0 and fb[i - 1][0] + fb[i - 1][1] == fb[i][0]:
+            fb[i - 1][1] += fb.pop(i)[1]
+
+    def _evict(self):
+        # Evict the least recently used asset that can be fetched again
+        victims = [(a.used, n) for (n, a) in self.allocations.items() if a.fetch is not None]
+        if not victims:
+            return False
+        self.free(min(victims)[1])
+        self.evictions += 1
+        return True
@@ -142,8 +142,11 @@ CHACK                  = const(0x58)
 MUTE                   = const(0x60)     # Management
 UNMUTE                 = const(0x61)
 
+RAM_G                  = const(0)
+RAM_G_SIZE             = const(0x100000)
 RAM_CMD                = const(0x308000)
 RAM_DL                 = const(0x300000)
+RAM_DL_SIZE            = const(0x2000)
 REG_CLOCK              = const(0x302008)
 REG_CMDB_SPACE         = const(0x302574)
 REG_CMDB_WRITE         = const(0x302578)
@@ -0,0 +1,47 @@
+"""
+Streaming image writers for ``BaseEVE.screenshot``.
+
+Each writer takes one RGB scanline at a time, so a capture can go straight
+to a file or socket (use ``socket.makefile("wb")``) without holding the
+whole frame.
+"""
+
+import struct
+import zlib
+
+class PPMWriter:
+    """ Binary PPM (P6) """
+
+    def __init__(self, f, w, h):
+        self.f = f
+        f.write(b"P6\n%d %d\n255\n" % (w, h))
+
+    def __call__(self, line):
+        self.f.write(line)
+
+    def close(self):
+        pass
+
+class PNGWriter:
+    """ 8-bit RGB PNG, compressed as the lines arrive """
+
+    def __init__(self, f, w, h, level = 6):
+        self.f = f
+        self.z = zlib.compressobj(level)
+        f.write(b"\x89PNG\r\n\x1a\n")
+        self._chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 2, 0, 0, 0))
+
+    def _chunk(self, kind, data):
+        self.f.write(struct.pack(">I", len(data)) + kind)
+        self.f.write(data)
+        self.f.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(kind)) & 0xffffffff))
+
+    def __call__(self, line):
+        # Filter type 0 (None) for every line
+        z = self.z.compress(b"\x00") + self.z.compress(line)
+        if z:
+            self._chunk(b"IDAT", z)
+
+    def close(self):
+        self._chunk(b"IDAT", self.z.flush())
+        self._chunk(b"IEND", b"")
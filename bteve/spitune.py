@@ -0,0 +1,112 @@
+import os
+import time
+import binascii
+
+from .eve import CoprocessorException
+from .registers import REG_ID
+
+RATES = (
+    4_000_000, 6_000_000, 8_000_000, 10_000_000, 12_000_000, 15_000_000,
+    20_000_000, 24_000_000, 30_000_000,
+)
+
+def _idle(gd, timeout):
+    # Wait for the coprocessor, but give up after timeout seconds: at a bad
+    # rate, a corrupted command can leave it waiting for data forever
+    t0 = time.monotonic()
+    while not gd.is_idle():
+        if time.monotonic() - t0 > timeout:
+            return False
+        time.sleep(gd.POLL_MAX)
+    return True
+
+def check_link(gd, addr = 0, size = 4096, timeout = 0.1):
+    """
+    Test the SPI link at its current rate. A pseudo-random block is
+    written to RAM_G at ``addr``, then checked both by ``cmd_memcrc``
+    and by reading it back. Returns True if both match, and False if
+    they do not or the coprocessor takes over ``timeout`` seconds.
+    """
+    try:
+        if gd.rd32(REG_ID) != 0x7c or not _idle(gd, timeout):
+            return False
+        pattern = os.urandom(size)
+        gd.write_from(addr, pattern)
+        gd.cmd_memcrc(addr, size, 0)
+        gd.push()
+        if not _idle(gd, timeout):
+            return False
+        if gd.result() != (binascii.crc32(pattern) & 0xffffffff):
+            return False
+        return gd.rd(addr, size) == pattern
+    except CoprocessorException:
+        # Corrupted commands fault the coprocessor
+        return False
+
+def _saved(path):
+    try:
+        with open(path) as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return None
+
+def tune_spi(gd, rates = RATES, path = None, margin = 1, trials = 3, addr = 0, size = 4096):
+    """
+    Find the fastest reliable SPI rate for ``gd`` and switch to it.
+
+    Each rate in ``rates``, slowest first, must pass ``check_link``
+    ``trials`` times. Stepping stops at the first failure, and the chosen
+    rate is ``margin`` steps below the fastest that passed. If every rate
+    passes, the fastest is used.
+
+    With ``path``, the result is saved there, and later calls that find
+    it just check it once instead of calibrating again.
+
+    Run this at startup, before setting up the panel. After a failure the
+    EVE is rebooted at the slowest rate, since a bad link may have
+    written anywhere.
+
+    ``gd`` must have ``configure_spi(speed)``.
+
+    :return: the chosen rate in Hz
+    """
+    gd.register(gd)
+    if path is not None:
+        r = _saved(path)
+        if r is not None:
+            gd.configure_spi(r)
+            if check_link(gd, addr, size):
+                return r
+            # The failed check may have left the coprocessor faulted
+            gd.configure_spi(rates[0])
+            gd.boot()
+
+    good = None
+    failed = False
+    for (i, r) in enumerate(rates):
+        gd.configure_spi(r)
+        if all(check_link(gd, addr, size) for _ in range(trials)):
+            good = i
+        else:
+            failed = True
+            break
+
+    if good is None:
+        gd.configure_spi(rates[0])
+        print("SPI link fails at %d Hz" % rates[0])
+        return rates[0]
+    if failed:
+        gd.configure_spi(rates[0])
+        gd.boot()
+        good = max(0, good - margin)
+    r = rates[good]
+    gd.configure_spi(r)
+
+    if path is not None:
+        try:
+            with open(path, "w") as f:
+                f.write("%d\n" % r)
+        except OSError:
+            # For example a read-only CircuitPython filesystem
+            pass
+    return r
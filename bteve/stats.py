@@ -0,0 +1,160 @@
+import time
+
+from .eve import BaseEVE
+from .registers import REG_CMDB_WRITE
+
+def _is_cmdb(h):
+    # Is h the SPI header of a write to REG_CMDB_WRITE?
+    return h[2] == (REG_CMDB_WRITE & 0xff) and h[1] == ((REG_CMDB_WRITE >> 8) & 0xff) and h[0] == (0x80 | (REG_CMDB_WRITE >> 16))
+
+class Stats:
+    """
+    Performance counters for a BaseEVE.
+
+    ``Stats(gd)`` wraps the instance's ``transfer``, ``finish`` and
+    ``swap`` methods, and ``detach()`` restores them. Nothing is counted,
+    and nothing costs anything, until a Stats is attached.
+
+    The counters in ``FIELDS`` are running totals. After each ``swap()``,
+    ``frame`` holds what the last frame added to each of them, and
+    ``build_time``, ``swap_time``, ``swap_interval`` and ``dl_used``
+    describe that frame:
+
+    - ``build_time``: host time from the end of the previous swap to this one
+    - ``swap_time``: host time spent in ``swap()``
+    - ``swap_interval``: time between successive swaps
+    - ``dl_used``: bytes of display list used, if ``dl_probe`` is set.
+      This is the BaseEVE's own ``dl_used``, which ``swap()`` takes from
+      ``REG_CMD_DL`` through a probe in RAM_G. The figure arrives at
+      least one frame late, but without a wait for the coprocessor.
+
+    ``as_dict()`` and ``csv()`` export the last frame for logging.
+
+    :param gd: the BaseEVE to measure
+    :param dl_probe: a RAM_G address for the display list probe, or None
+        to use the BaseEVE's ``dl_probe``
+    """
+
+    FIELDS = (
+        "transfers",        # SPI transactions
+        "bytes_out",        # bytes sent, including address headers
+        "bytes_in",         # bytes received
+        "transfer_time",    # seconds inside transfer
+        "cmd_bytes",        # bytes written to the command FIFO
+        "reserve_polls",    # REG_CMDB_SPACE polls that found too little space
+        "finish_polls",     # of those, polls made while in finish()
+        "stall_time",       # seconds waiting for FIFO space
+    )
+    FRAME = ("build_time", "swap_time", "swap_interval", "dl_used")
+
+    def __init__(self, gd, dl_probe = None):
+        self.gd = gd
+        if dl_probe is not None:
+            gd.dl_probe = dl_probe
+        self.frames = 0
+        for f in self.FIELDS + self.FRAME:
+            setattr(self, f, 0)
+        self.frame = {f: 0 for f in self.FIELDS}
+        self.t_swap = self.t_end = time.monotonic()
+        self.attach()
+
+    def attach(self):
+        gd = self.gd
+        self.saved = {m: gd.__dict__.get(m) for m in ("transfer", "transfer_into", "finish", "swap")}
+        self._mark()
+        self.polls0 = gd.stall_polls
+        self.stall0 = gd.stall_time
+
+        transfer = gd.transfer
+        def counted_transfer(wr, rd = 0):
+            t = time.monotonic()
+            r = transfer(wr, rd)
+            self.transfer_time += time.monotonic() - t
+            self.transfers += 1
+            self.bytes_out += len(wr)
+            self.bytes_in += rd
+            if _is_cmdb(wr):
+                self.cmd_bytes += len(wr) - 3
+            return r
+        gd.transfer = counted_transfer
+
+        # The default transfer_into goes through transfer, so is already counted
+        if type(gd).transfer_into is not BaseEVE.transfer_into:
+            transfer_into = gd.transfer_into
+            def counted_transfer_into(hdr, wr = None, rd = None):
+                t = time.monotonic()
+                transfer_into(hdr, wr, rd)
+                self.transfer_time += time.monotonic() - t
+                self.transfers += 1
+                self.bytes_out += len(hdr)
+                if wr is not None:
+                    self.bytes_out += len(wr)
+                    if _is_cmdb(hdr):
+                        self.cmd_bytes += len(wr)
+                if rd is not None:
+                    self.bytes_in += len(rd)
+            gd.transfer_into = counted_transfer_into
+
+        finish = gd.finish
+        def counted_finish():
+            p0 = gd.stall_polls
+            finish()
+            self.finish_polls += gd.stall_polls - p0
+        gd.finish = counted_finish
+
+        swap = gd.swap
+        def counted_swap():
+            t = time.monotonic()
+            swap()
+            self._swapped(t, time.monotonic())
+        gd.swap = counted_swap
+
+    def detach(self):
+        """ Stop counting, restoring the BaseEVE's own methods """
+        gd = self.gd
+        for (m, f) in self.saved.items():
+            if f is None:
+                if m in gd.__dict__:
+                    delattr(gd, m)
+            else:
+                setattr(gd, m, f)
+
+    def _mark(self):
+        self.mark = [getattr(self, f) for f in self.FIELDS]
+
+    def _swapped(self, t, t1):
+        gd = self.gd
+        self.reserve_polls = gd.stall_polls - self.polls0
+        self.stall_time = gd.stall_time - self.stall0
+        self.build_time = t - self.t_end
+        self.swap_time = t1 - t
+        self.swap_interval = t - self.t_swap
+        self.t_swap = t
+        self.dl_used = gd.dl_used
+        for (f, m) in zip(self.FIELDS, self.mark):
+            self.frame[f] = getattr(self, f) - m
+        self._mark()
+        self.frames += 1
+        self.t_end = time.monotonic()
+
+    def as_dict(self):
+        """ The last frame's figures """
+        d = dict(self.frame)
+        d["frames"] = self.frames
+        for f in self.FRAME:
+            d[f] = getattr(self, f)
+        return d
+
+    def totals(self):
+        """ The running totals """
+        d = {f: getattr(self, f) for f in self.FIELDS}
+        d["frames"] = self.frames
+        return d
+
+    def csv_header(self):
+        return ",".join(("frames", ) + self.FIELDS + self.FRAME)
+
+    def csv(self):
+        """ The last frame's figures as a CSV line, in ``csv_header()`` order """
+        d = self.as_dict()
+        return ",".join(str(d[f]) for f in ("frames", ) + self.FIELDS + self.FRAME)
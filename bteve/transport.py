@@ -0,0 +1,178 @@
+"""
+Host transports: the byte movers under ``BaseEVE``, for driving an EVE from
+CPython on Linux or through a USB-SPI bridge.
+
+A transport runs one SPI transaction per ``transfer_into(hdr, wr, rd)``:
+with chip select asserted it sends ``hdr``, then either sends ``wr`` or
+reads into ``rd``. ``max_transfer`` is the most bytes, header included,
+that it can move under one chip select. ``TransportEVE`` passes it on to
+``BaseEVE``, which splits longer transfers and sizes its chunks to fit.
+"""
+
+from .eve import BaseEVE
+
+class Transport:
+    """
+    The base of the transports. A subclass provides
+    ``transfer_into(hdr, wr = None, rd = None)``, which runs one SPI
+    transaction as described above. Where it has limits or settings, it
+    also sets ``max_transfer`` and overrides ``set_speed(hz)``,
+    ``lock()``, ``unlock()`` and ``close()``, which do nothing here.
+    """
+
+    max_transfer = None     # None for no limit
+
+    def set_speed(self, hz):
+        pass
+
+    def lock(self):
+        pass
+
+    def unlock(self):
+        pass
+
+    def close(self):
+        pass
+
+def _spidev_bufsiz():
+    try:
+        with open("/sys/module/spidev/parameters/bufsiz") as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return 4096
+
+class SpidevTransport(Transport):
+    """
+    Linux ``/dev/spidevB.D`` through the ``spidev`` module.
+
+    Each transaction is a single ioctl. The kernel's spidev ``bufsiz``
+    limits one ioctl, so it is advertised as ``max_transfer``. Raise it
+    with the ``spidev.bufsiz`` module parameter for larger bursts.
+    """
+
+    def __init__(self, bus = 0, device = 0, speed = 10_000_000, mode = 0):
+        import spidev
+        self.spi = spidev.SpiDev()
+        self.spi.open(bus, device)
+        self.spi.max_speed_hz = speed
+        self.spi.mode = mode
+        self.max_transfer = _spidev_bufsiz()
+
+    def transfer_into(self, hdr, wr = None, rd = None):
+        if rd is None:
+            self.spi.writebytes2(bytes(hdr) + bytes(wr) if wr is not None else bytes(hdr))
+        else:
+            r = self.spi.xfer2(list(hdr) + [0] * len(rd))
+            rd[:] = bytes(r[len(hdr):])
+
+    def set_speed(self, hz):
+        self.spi.max_speed_hz = hz
+
+    def close(self):
+        self.spi.close()
+
+class USBSPITransport(Transport):
+    """
+    A USB-SPI bridge, such as an FTDI FT232H, through any port object
+    with a pyftdi-style ``exchange(out, readlen)`` that frames one
+    transaction with chip select.
+
+    :param port: the bridge's SPI port
+    :param max_transfer: the most bytes the bridge moves in one transaction
+    """
+
+    def __init__(self, port, max_transfer = 0x10000):
+        self.port = port
+        self.max_transfer = max_transfer
+
+    @classmethod
+    def ftdi(cls, url = "ftdi://ftdi:232h/1", cs = 0, speed = 10_000_000, **kw):
+        """ Open an FTDI MPSSE bridge with pyftdi """
+        from pyftdi.spi import SpiController
+        c = SpiController()
+        c.configure(url)
+        t = cls(c.get_port(cs = cs, freq = speed, mode = 0), **kw)
+        t.controller = c
+        return t
+
+    def transfer_into(self, hdr, wr = None, rd = None):
+        if rd is None:
+            self.port.exchange(bytes(hdr) + bytes(wr) if wr is not None else bytes(hdr), 0)
+        else:
+            rd[:] = self.port.exchange(bytes(hdr), len(rd))
+
+    def set_speed(self, hz):
+        self.port.set_frequency(hz)
+
+    def close(self):
+        c = getattr(self, "controller", None)
+        if c is not None:
+            c.terminate()
+
+class LoopbackTransport(Transport):
+    """
+    A transport for tests, connected to an object with ``transfer(wr, rd)``,
+    by default a new ``Emulator``. It checks that no transaction exceeds
+    ``max_transfer``, and counts them. Above ``max_speed`` it corrupts
+    what it reads, like an overclocked link.
+    """
+
+    speed = 0
+
+    def __init__(self, device = None, max_transfer = None, max_speed = None):
+        if device is None:
+            from .emulator import Emulator
+            device = Emulator()
+        self.device = device
+        self.max_transfer = max_transfer
+        self.max_speed = max_speed
+        self.transactions = 0
+        self.largest = 0
+
+    def transfer_into(self, hdr, wr = None, rd = None):
+        n = len(hdr) + (len(wr) if wr is not None else 0) + (len(rd) if rd is not None else 0)
+        assert self.max_transfer is None or n <= self.max_transfer, "Transaction of %d bytes" % n
+        self.transactions += 1
+        self.largest = max(self.largest, n)
+        if rd is None:
+            self.device.transfer(bytes(hdr) + bytes(wr) if wr is not None else bytes(hdr))
+        else:
+            rd[:] = self.device.transfer(bytes(hdr), len(rd))
+            if self.max_speed is not None and self.speed > self.max_speed and len(rd):
+                rd[-1] ^= 0x01
+
+    def set_speed(self, hz):
+        self.speed = hz
+
+class TransportEVE(BaseEVE):
+    """
+    A BaseEVE on a host transport, for example::
+
+        gd = TransportEVE(SpidevTransport(0, 0))
+        gd.boot()
+        gd.panel_800x480()
+    """
+
+    def __init__(self, transport):
+        self.transport = transport
+        self.max_transfer = transport.max_transfer
+
+    def transfer(self, wr, rd = 0):
+        if rd == 0:
+            self.transport.transfer_into(wr)
+            return None
+        r = bytearray(rd)
+        self.transport.transfer_into(wr, None, r)
+        return r
+
+    def transfer_into(self, hdr, wr = None, rd = None):
+        self.transport.transfer_into(hdr, wr, rd)
+
+    def configure_spi(self, speed):
+        self.transport.set_speed(speed)
+
+    def _lock_bus(self):
+        self.transport.lock()
+
+    def _unlock_bus(self):
+        self.transport.unlock()
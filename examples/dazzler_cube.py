@@ -285,7 +285,7 @@ def cube_main(gd):
     gd.BitmapHandle(0)
     gd.BitmapSize(eve.NEAREST, eve.BORDER, eve.BORDER, 0, 0)
 
-    g1=gd.controllers()[0]          # Note: this is a ONE TIME variable "snapshot" of all the sticks and buttons
+    g1=gd.controllers()[0]          # Note: the sticks and buttons are updated in place by each gd.controllers() call
     cx=gd.w//2
     cy=gd.h//2
     rx = 0